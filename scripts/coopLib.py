@@ -11,11 +11,19 @@
 @run:           import coopLib as lib (suggested)
 """
 from __future__ import print_function
-import os, sys, subprocess, shutil, re, logging, json, math, traceback
+import os, sys, subprocess, shutil, re, logging, json, math, struct, codecs, hashlib, zlib, itertools, traceback, multiprocessing
+import collections
 from functools import wraps
+from multiprocessing.pool import ThreadPool
 import maya.mel as mel
 import maya.cmds as cmds
 import maya.api.OpenMaya as om  # python api 2.0
+import coopUndo
+
+try:
+    import numpy as np   # not shipped with every Maya version
+except ImportError:
+    np = None
 
 try:
     basestring           # Python 2
@@ -546,6 +554,61 @@ def setAttr(obj, attr, value, silent=False):
         return False
 
 
+def getPlugs(attributes):
+    """
+    Get the plugs of attributes in one pass, skipping attributes that don't exist
+    Args:
+        attributes (list): List of attributes (str) e.g. ["node.attr"]
+    Returns:
+        (dict): Dictionary of attribute (str) -> MPlug
+    """
+    plugs = dict()
+    selectionList = om.MSelectionList()
+    for attribute in attributes:
+        try:
+            selectionList.add(attribute)
+        except RuntimeError:
+            continue  # attribute doesn't exist
+        plugs[attribute] = selectionList.getPlug(selectionList.length() - 1)
+    return plugs
+
+
+def isSinglePrecision(plug):
+    """
+    Checks if a numeric plug stores its value in single precision
+    Args:
+        plug (MPlug): Plug to check
+    Returns:
+        (bool): True if the plug is a float
+    """
+    oAttr = plug.attribute()
+    if not oAttr.hasFn(om.MFn.kNumericAttribute):
+        return False
+    return om.MFnNumericAttribute(oAttr).numericType() == om.MFnNumericData.kFloat
+
+
+def setPlugValues(plugValues, undoable=False, undoValues=None):
+    """
+    Set numeric plug values in bulk
+    Values are applied through a single MDGModifier, which only registers in the undo queue if undoable
+    Args:
+        plugValues (list): List of (MPlug, value) tuples
+        undoable (bool): If the values should be set as a single undoable operation
+        undoValues (list): List of (MPlug, value) tuples to restore on undo (default: the current values)
+    """
+    if undoable:
+        plugValues = list(plugValues)
+        if undoValues is None:
+            undoValues = [(plug, plug.asDouble()) for plug, value in plugValues]
+        # a modifier only runs its operations once, each undo/redo sets the values through a new one
+        coopUndo.commit(lambda: setPlugValues(undoValues), lambda: setPlugValues(plugValues))
+        return
+    modifier = om.MDGModifier()
+    for plug, value in plugValues:
+        modifier.newPlugValueDouble(plug, value)
+    modifier.doIt()
+
+
 def distanceBetween(obj1, obj2):
     """
     Distance between objects
@@ -614,6 +677,56 @@ def snap(source='', targets=[], type="translation"):
         printInfo("Position snapped")
 
 
+class ProgressWindow(object):
+    """
+    Interruptable progress window, silent when Maya runs in batch mode
+    """
+    def __init__(self, title, maxValue, status=""):
+        """
+        Progress window constructor
+        Args:
+            title (str): Title of the progress window
+            maxValue (int): Value at which the progress is complete
+            status (str): Initial status message
+        """
+        self.interactive = not cmds.about(batch=True)
+        self.value = 0
+        self.maxValue = max(maxValue, 1)
+        if self.interactive:
+            cmds.progressWindow(title=title, progress=0, maxValue=self.maxValue, status=status, isInterruptable=True)
+
+    def update(self, status="", step=1):
+        """
+        Advances the progress
+        Args:
+            status (str): Status message to display
+            step (int): Amount to advance the progress by
+        Returns:
+            (bool): False if the user has cancelled the operation
+        """
+        self.value += step
+        if self.interactive:
+            cmds.progressWindow(e=True, progress=self.value, status=status)
+        return not self.isCancelled()
+
+    def isCancelled(self):
+        """
+        Returns if the user has cancelled the operation
+        Returns:
+            bool
+        """
+        if self.interactive:
+            return cmds.progressWindow(q=True, isCancelled=True)
+        return False
+
+    def end(self):
+        """
+        Closes the progress window
+        """
+        if self.interactive:
+            cmds.progressWindow(endProgress=True)
+
+
 ######################################################################################
 # RENDERING UTILITIES
 ######################################################################################
@@ -653,6 +766,174 @@ def getMaterials(objects):
     return materials
 
 
+class MaterialResolver(object):
+    """
+    Memoized resolution of objects to their materials through shading engine connections
+    Only the last resolution is kept (e.g., of the current selection), it is reset by DG callbacks whenever shading
+    engine connections or node names change
+    """
+    def __init__(self):
+        self.objects = None  # frozenset of the objects of the last resolution
+        self.materials = []  # list of materials of the last resolution
+        self.callbacks = []
+
+    def get(self, objects):
+        """
+        Gets the materials assigned to objects, resolving them only if they are not memoized
+        Args:
+            objects (list): List of objects or components
+        Returns:
+            (list): List of materials
+        """
+        key = frozenset(objects)
+        if key != self.objects:
+            if not self.callbacks:
+                self.callbacks = [om.MDGMessage.addConnectionCallback(self.connectionChanged),
+                                  om.MNodeMessage.addNameChangedCallback(om.MObject(), self.reset),
+                                  om.MSceneMessage.addCallback(om.MSceneMessage.kBeforeOpen, self.reset),
+                                  om.MSceneMessage.addCallback(om.MSceneMessage.kBeforeNew, self.reset)]
+            self.materials = self.resolve(objects)
+            self.objects = key
+        return list(self.materials)
+
+    @staticmethod
+    def resolve(objects):
+        """
+        Resolves the materials assigned to objects in one batched query
+        Args:
+            objects (list): List of objects, components or materials themselves
+        Returns:
+            (list): List of materials
+        """
+        if not objects:
+            return []
+        materials = cmds.ls(objects, mat=True)
+        shapes = getShapes(objects, l=True, quiet=True)
+        if shapes:
+            shadingEngines = ListUtils.removeDuplicates(cmds.listConnections(shapes, type="shadingEngine"))
+            if shadingEngines:
+                ListUtils.update(materials, cmds.ls(cmds.listConnections(shadingEngines, s=True, d=False), mat=True))
+        return materials
+
+    def connectionChanged(self, srcPlug, destPlug, made, *args):
+        if srcPlug.node().hasFn(om.MFn.kShadingEngine) or destPlug.node().hasFn(om.MFn.kShadingEngine):
+            self.reset()
+
+    def reset(self, *args):
+        """
+        Resets the memoized resolution
+        """
+        self.objects = None
+        self.materials = []
+
+
+materialResolver = MaterialResolver()  # shared material resolver
+
+
+class ShaderFXNodeIds(object):
+    """
+    Memoized ShaderFX node ids, keyed by material and unique node name
+    Materials are forgotten whenever loadGraph() replaces their graph, they are removed/renamed or a scene is opened
+    """
+    def __init__(self):
+        self.graphs = dict()  # material -> graph name
+        self.ids = dict()  # (material, unique node name) -> node id
+        self.graphCallbacks = []  # functions called with the material whenever a graph is loaded into it
+        self.callbacks = []
+
+    def get(self, mat, uniqueNodeName):
+        """
+        Gets the id of uniqueNodeName within the graph of mat, looking it up only if it is not memoized
+        Args:
+            mat (str): ShaderFX material to get node id from
+            uniqueNodeName (str): Unique node name in ShaderFX
+        Returns:
+            (int): Node id in ShaderFX graph
+        """
+        key = (mat, uniqueNodeName)
+        if key not in self.ids:
+            self.watch()
+            self.ids[key] = cmds.shaderfx(sfxnode=mat, getNodeIDByName=uniqueNodeName)
+        return self.ids[key]
+
+    def graph(self, mat):
+        """
+        Gets the name of the graph loaded in mat, looking it up only if it is not memoized
+        Args:
+            mat (str): ShaderFX material
+        Returns:
+            (str): Graph name, or the material itself for graphs without a name
+        """
+        if mat not in self.graphs:
+            self.watch()
+            graph = ""
+            try:
+                graph = str(cmds.shaderfx(sfxnode=mat, getPropertyValue=(self.get(mat, "graphName"), "value")))
+            except RuntimeError:
+                pass
+            self.graphs[mat] = graph or mat
+        return self.graphs[mat]
+
+    def watch(self):
+        """
+        Registers the callbacks that forget removed/renamed materials and reset on scene changes
+        """
+        if not self.callbacks:
+            self.callbacks = [om.MDGMessage.addNodeRemovedCallback(self.nodeRemoved),
+                              om.MNodeMessage.addNameChangedCallback(om.MObject(), self.nameChanged),
+                              om.MSceneMessage.addCallback(om.MSceneMessage.kBeforeOpen, self.reset),
+                              om.MSceneMessage.addCallback(om.MSceneMessage.kBeforeNew, self.reset)]
+
+    def forget(self, mat):
+        """
+        Forgets the graph name and node ids of mat
+        Args:
+            mat (str): ShaderFX material
+        """
+        self.graphs.pop(mat, None)
+        for key in [key for key in self.ids if key[0] == mat]:
+            del self.ids[key]
+
+    def graphLoaded(self, mat):
+        """
+        Forgets the node ids of mat, as a newly loaded graph may renumber its nodes
+        Args:
+            mat (str): ShaderFX material a graph has been loaded into
+        """
+        self.forget(mat)
+        for callback in self.graphCallbacks:
+            callback(mat)
+
+    def nodeRemoved(self, node, *args):
+        if self.graphs or self.ids:
+            self.forget(om.MFnDependencyNode(node).name())
+
+    def nameChanged(self, node, prevName, *args):
+        if self.graphs or self.ids:
+            self.forget(prevName)
+
+    def reset(self, *args):
+        """
+        Resets all memoized graphs and node ids
+        """
+        self.graphs.clear()
+        self.ids.clear()
+
+
+sfxNodeIds = ShaderFXNodeIds()  # shared ShaderFX node id cache
+
+
+def loadGraph(mat, shaderFile):
+    """
+    Loads a ShaderFX graph into a material, invalidating its memoized node ids
+    Args:
+        mat (str): ShaderFX material to load the graph into
+        shaderFile (str): Path of the ShaderFX graph (.sfx)
+    """
+    cmds.shaderfx(sfxnode=mat, loadGraph=shaderFile)
+    sfxNodeIds.graphLoaded(mat)
+
+
 def cleanShadingEngines(objs):
     """
     Makes sure the shading engines are clean
@@ -756,22 +1037,94 @@ def screenshot(fileDir, width, height, format=".jpg", override="", ogs=True):
 #   | | | | | | | |_) | (_) | |  | |_   / /   |  __/>  <| |_) | (_) | |  | |_
 #   |_|_| |_| |_| .__/ \___/|_|   \__| /_/     \___/_/\_\ .__/ \___/|_|   \__|
 #               |_|                                     |_|
-def exportVertexColors(objs, path):
+VTX_COLOR_EXT = ".vcb"  # extension of binary vertex color containers
+VTX_COLOR_MAGIC = b"VCB1"  # first bytes of binary vertex color containers
+VTX_COLOR_VERSION = 2  # version of binary vertex color containers
+VTX_COLOR_ALIGN = 16  # byte alignment of arrays within binary vertex color containers
+VTX_COLOR_COMPRESSIONS = ["none", "zlib"]  # compression of the chunks of binary vertex color containers
+VTX_COLOR_ENCODINGS = ["dense", "sparse", "rle"]  # all vertices, non-default vertices, runs of non-default vertices
+VTX_COLOR_MATCHING = ["name", "topology"]  # how imported shapes are matched to shapes in the scene
+VTX_COLOR_CACHE_BYTES = 256 * 1024 * 1024  # size of the vertex color cache (32 bytes per vertex and color set)
+
+
+def exportVertexColors(objs, path, dtype="float32", encoding=None, namespace=None, compression="none",
+                       incremental=False):
     """
-    Exports vertex colors of objs to a json file at path
+    Exports vertex colors of objs to a json file or, if path ends in VTX_COLOR_EXT, to a binary container
     Args:
         objs: objects to export from
         path: path to save json file to
+        dtype (str): Float type of the arrays in binary containers, "float32" or "float16"
+        encoding (str): Encoding of the color sets, see VTX_COLOR_ENCODINGS. Sparse encodings only store the vertices
+                        that differ from the default color (0, 0, 0, 0) and can't be read by earlier json importers
+                        (default: "rle" for binary containers, "dense" for json files)
+        namespace (bool): If shapes are exported with their namespace (default: prompt, or False in batch mode)
+        compression (str): Compression of the chunks of binary containers, see VTX_COLOR_COMPRESSIONS
+        incremental (bool): If an existing binary container at path should be updated, reusing the chunks whose
+                            content hash and format did not change instead of encoding them again
+    Returns:
+        (list): Exported shape names
     """
-    # initialize variables
-    namespace = False
-    namespacePrompt = False
+    checkNumpy()
 
     # get shapes, its control sets and colors
     shapeDict = {}
-    shapes = getShapes(objs)
-    for shape in shapes:
+    topology = {}
+    for shape, shapeName in exportShapeNames(getShapes(objs), namespace):
         print("Extracting vertex colors from {0}".format(shape))
+
+        # get data
+        colorSetDict = {}
+        colorSets = cmds.polyColorSet(shape, query=True, allColorSets=True)
+        if colorSets:
+            for colorSet in colorSets:
+                colorSetDict[colorSet] = getVertexColorArray(shape, colorSet, cached=False)  # one-shot read
+            shapeDict[shapeName] = colorSetDict
+            topology[shapeName] = getTopologyFingerprint(shape)
+
+    if encoding is None:
+        encoding = "rle" if path.lower().endswith(VTX_COLOR_EXT) else "dense"
+    if encoding not in VTX_COLOR_ENCODINGS:
+        cmds.error("Vertex color encoding must be one of: {0}".format(", ".join(VTX_COLOR_ENCODINGS)))
+
+    if path.lower().endswith(VTX_COLOR_EXT):
+        previous = path if incremental and os.path.isfile(path) and isVertexColorContainer(path) else ""
+        reused = writeVertexColorContainer(shapeDict, path, dtype, topology, compression=compression,
+                                           encoding=encoding, previous=previous)
+        if previous:
+            print("{0} unchanged color sets were reused from the previous export".format(reused))
+    else:
+        # write and save json info
+        for colorSetDict in shapeDict.values():
+            for colorSet in colorSetDict:
+                if encoding == "dense":
+                    colorSetDict[colorSet] = colorSetDict[colorSet].tolist()
+                else:
+                    sparse = encodeSparseColors(colorSetDict[colorSet], rle=encoding == "rle")
+                    colorSetDict[colorSet] = dict((key, value.tolist() if isinstance(value, np.ndarray) else value)
+                                                  for key, value in sparse.items())
+        with open(path, 'w') as f:
+            json.dump(shapeDict, f, separators=(',', ':'), indent=2)
+
+    printInfo("Vertex colors successfully exported")
+    return sorted(shapeDict)
+
+
+def exportShapeNames(shapes, namespace=None):
+    """
+    Gets the names shapes are exported with, asking once if namespaces should be kept
+    Args:
+        shapes (list): Shapes to export
+        namespace (bool): If shapes keep their namespace (default: prompt, or False in batch mode)
+    Returns:
+        (list): (shape, shapeName) tuples
+    """
+    # initialize variables
+    namespacePrompt = namespace is not None or cmds.about(batch=True)
+    namespace = bool(namespace)
+
+    shapeNames = []
+    for shape in shapes:
         shapeName = "{0}".format(shape)
 
         # check for namespaces
@@ -791,77 +1144,707 @@ def exportVertexColors(objs, path):
         if not namespace:
             if namespaceQuery:
                 shapeName = shape[namespacePos+1:]
+        shapeNames.append((shape, shapeName))
+    return shapeNames
 
-        # get data
-        colorSetDict = {}
-        oShape = getMObject(shape)  # grabs the MObject of the shape
-        fnMesh = om.MFnMesh(oShape)  # access mesh data (oShape can also be replaced by MDagPath)
-        colorSets = cmds.polyColorSet(shape, query=True, allColorSets=True)
-        if colorSets:
-            for colorSet in colorSets:
-                oVertexColorArray = fnMesh.getVertexColors(colorSet)  # MColorArray
-                colorSetDict[colorSet] = [vtxColor.getColor() for vtxColor in oVertexColorArray]
-            shapeDict[shapeName] = colorSetDict
 
-    # write and save json info
-    with open(path, 'w') as f:
-        json.dump(shapeDict, f, separators=(',', ':'), indent=2)
+def exportVertexColorSequence(objs, path, frames, dtype="float32", namespace=None, compression="none"):
+    """
+    Exports the animated vertex colors of objs over frames to a binary container
+    Each color set is stored as a (frames x vertices x RGBA) chunk holding only the frames that changed, plus the last
+    frame of each hold before a change, so that linear interpolation between the stored frames is exact
+    Args:
+        objs: objects to export from
+        path (str): path of the binary container
+        frames (list): Frames to sample
+        dtype (str): Float type of the arrays, "float32" or "float16"
+        namespace (bool): If shapes are exported with their namespace (default: prompt, or False in batch mode)
+        compression (str): Compression of the chunks, see VTX_COLOR_COMPRESSIONS
+    Returns:
+        (list): Exported shape names
+    """
+    checkNumpy()
+    colorSets = dict()  # (shape, shapeName) -> color sets
+    for shape, shapeName in exportShapeNames(getShapes(objs), namespace):
+        shapeColorSets = cmds.polyColorSet(shape, query=True, allColorSets=True)
+        if shapeColorSets:
+            colorSets[(shape, shapeName)] = shapeColorSets
+
+    # sample frames, keeping changed frames and the previous frame of each change
+    sampled = dict()  # (shapeName, colorSet) -> [frames, colors, last sampled frame, last sampled colors]
+    currentFrame = cmds.currentTime(query=True)
+    progress = ProgressWindow("Exporting vertex color sequence", len(frames))
+    try:
+        for frame in frames:
+            if not progress.update("Sampling frame {0}".format(frame)):
+                cmds.error("Vertex color sequence export was cancelled")
+            cmds.currentTime(frame, update=True)
+            for (shape, shapeName), shapeColorSets in colorSets.items():
+                for colorSet in shapeColorSets:
+                    colors = getVertexColorArray(shape, colorSet, cached=False)
+                    samples = sampled.setdefault((shapeName, colorSet), [[], [], None, None])
+                    if samples[3] is None or not np.array_equal(colors, samples[3]):
+                        if samples[2] is not None and samples[0][-1] != samples[2]:
+                            samples[0].append(samples[2])  # end of the hold
+                            samples[1].append(samples[3])
+                        samples[0].append(frame)
+                        samples[1].append(colors)
+                    samples[2:] = [frame, colors]
+    finally:
+        progress.end()
+        cmds.currentTime(currentFrame, update=True)
+
+    shapeDict = dict()
+    sequenceFrames = dict()
+    for (shapeName, colorSet), samples in sampled.items():
+        if samples[0][-1] != samples[2]:
+            samples[0].append(samples[2])  # hold until the last frame
+            samples[1].append(samples[3])
+        shapeDict.setdefault(shapeName, dict())[colorSet] = np.stack(samples[1])
+        sequenceFrames.setdefault(shapeName, dict())[colorSet] = samples[0]
+    topology = dict((shapeName, getTopologyFingerprint(shape)) for shape, shapeName in colorSets)
+    writeVertexColorContainer(shapeDict, path, dtype, topology, sequenceFrames, compression)
+
+    printInfo("Vertex color sequence successfully exported")
+    return sorted(shapeDict)
+
+
+def importVertexColors(path, match="name", namespace=None, apply=None, colorSets=None):
+    """
+    Import vertex colors from a json file or a binary container at path
+    The file is streamed, one color set is read and applied at a time to keep memory bounded by the largest color set
+    Args:
+        path: path of json file with vertex color information
+        match (str): How shapes are found in the scene, see VTX_COLOR_MATCHING. "name" prompts for a namespace if
+                     shapes are missing, "topology" matches the topology fingerprints of binary containers without
+                     prompting, preferring scene shapes with the same name (regardless of namespace) among equals
+        namespace (str): Namespace of the shapes when matching by name, "" for none (default: prompt if shapes are
+                         missing, or none in batch mode)
+        apply (function): Applies the colors of each color set as apply(shape, colorSet, colors), e.g. to import
+                          animated sequences (default: applyVertexColors)
+        colorSets (list): Only import these color sets (default: all color sets)
+    Returns:
+        (list): Scene shapes that received vertex colors
+    """
+    checkNumpy()
+    apply = apply or applyVertexColors
+    if match not in VTX_COLOR_MATCHING:
+        cmds.error("Vertex color matching must be one of: {0}".format(", ".join(VTX_COLOR_MATCHING)))
 
-    printInfo("Vertex colors successfully exported")
+    # initialize variables
+    namespacePrompt = namespace is not None or cmds.about(batch=True)
+    namespace = namespace or ""
+    imported = []
+    shapeName = ""
+    shapeExists = False
+    lastShape = None
+    stream = VertexColorStream(path, colorSets)
+    if match == "topology":
+        if not stream.binary:
+            cmds.error("Matching shapes by topology requires a binary vertex color container ({0})".format(VTX_COLOR_EXT))
+        topologyIndex = TopologyIndex()
+    progress = ProgressWindow("Importing vertex colors", stream.size // 1024, os.path.basename(path))
+    progressValue = 0
+
+    try:
+        # assign vertex color parameters on each shape
+        for shape, colorSet, colors in stream:
+            if shape != lastShape:
+                lastShape = shape
+                position = stream.position() // 1024
+                if not progress.update("Importing parameters to {0}".format(shape), position - progressValue):
+                    printWarning("Vertex color import was cancelled, {0} was not imported".format(shape))
+                    break
+                progressValue = position
+                print("Importing parameters to {0}".format(shape))
+                if match == "topology":
+                    shapeName = topologyIndex.match(stream.topology.get(shape), shape)
+                else:
+                    shapeName = "{0}".format(shape)
+                    if namespace:
+                        shapeName = "{0}:{1}".format(namespace, shapeName)
+
+                    # check for namespaces
+                    if not cmds.objExists(shape) and not namespacePrompt:
+                        result = cmds.promptDialog(title='Possible namespace issues',
+                                                   message='Some shapes where not found in the scene. Could they be under a different namespace?',
+                                                   button=['Change namespace', 'No'], defaultButton='Change namespace', cancelButton='No', dismissString='No')
+                        if result == 'Change namespace':
+                            namespace = cmds.promptDialog(query=True, text=True)
+                            shapeName = "{0}:{1}".format(namespace, shapeName)
+                        namespacePrompt = True
+
+                shapeExists = bool(shapeName) and cmds.objExists(shapeName)
+                if shapeExists:
+                    imported.append(shapeName)
+                else:
+                    logger.debug("No {0} shape exists in the scene".format(shapeName or shape))
+                shapeColorSets = cmds.polyColorSet(shapeName, query=True, allColorSets=True) if shapeExists else None
+                if shapeColorSets == None:
+                    shapeColorSets = []
+
+            if shapeExists:
+                if colorSet not in shapeColorSets:
+                    cmds.polyColorSet(shapeName, newColorSet=colorSet)
+                apply(shapeName, colorSet, colors)
+        else:
+            printInfo("Vertex colors successfully imported from {0}".format(os.path.basename(path)))
+    finally:
+        progress.end()
+    return imported
 
 
-def importVertexColors(path):
+def applyVertexColors(shape, colorSet, colors):
     """
-    Import vertex colors from a json file at path
+    Applies imported vertex colors to an existing color set, matching them by vertex index
     Args:
-        path: path of json file with vertex color information
+        shape (str): Name of the shape
+        colorSet (str): Name of the color set
+        colors (list, ndarray, dict): (N, 4) RGBA vertex colors or their sparse encoding (see encodeSparseColors)
+    """
+    if isinstance(colors, dict):
+        if "frames" in colors:
+            cmds.error("{0} of {1} is an animated sequence, it needs to be imported as such".format(colorSet, shape))
+        colors = decodeSparseColors(colors)
+    colors = np.asarray(colors, dtype=np.float32).reshape(-1, 4)
+    vertexCount = om.MFnMesh(getMObject(shape)).numVertices
+    if len(colors) != vertexCount:
+        logger.warning("{0} has {1} vertices, but {2} colors were imported into {3}".format(shape, vertexCount,
+                                                                                          len(colors), colorSet))
+        colors = colors[:vertexCount]
+    vertices = None
+    if len(colors) < vertexCount:
+        vertices = np.arange(len(colors))  # partial write, remaining vertices keep their colors
+    setVertexColorArray(shape, colorSet, colors, vertices, cached=False)  # one-shot write, not cached
+
+
+def encodeSparseColors(colors, default=(0, 0, 0, 0), rle=False):
+    """
+    Encodes vertex colors sparsely, keeping only the vertices that differ from the default color
+    Args:
+        colors (ndarray): (N, 4) RGBA vertex colors
+        default (tuple): Default RGBA color
+        rle (bool): If the indices of the kept vertices should be run-length encoded
+    Returns:
+        (dict): "count" of vertices, "default" color, (K, 4) "values" and either (K,) uint32 "indices" or, if rle,
+                (R, 2) uint32 "runs" of consecutive indices as (start, length)
+    """
+    colors = np.asarray(colors).reshape(-1, 4)
+    indices = np.flatnonzero((colors != np.asarray(default, dtype=colors.dtype)).any(axis=1)).astype(np.uint32)
+    sparse = {"count": len(colors), "default": list(default), "values": colors[indices]}
+    if rle:
+        starts = np.flatnonzero(np.diff(indices.astype(np.int64)) != 1) + 1  # positions where a new run begins
+        starts = np.concatenate(([0], starts)) if len(indices) else starts
+        lengths = np.diff(np.concatenate((starts, [len(indices)])))
+        sparse["runs"] = np.stack((indices[starts], lengths), axis=1).astype(np.uint32)
+    else:
+        sparse["indices"] = indices
+    return sparse
+
+
+def decodeSparseColors(sparse, dtype="float32"):
     """
-    # initialize variables
-    namespace = ""
-    namespacePrompt = False
+    Decodes sparsely encoded vertex colors (see encodeSparseColors) by filling the remaining vertices with the default
+    Args:
+        sparse (dict): Sparse encoding with "count", "default", "values" and "indices" or "runs"
+        dtype (str): Float type of the decoded colors
+    Returns:
+        (ndarray): (N, 4) RGBA vertex colors
+    """
+    colors = np.empty((sparse["count"], 4), dtype=dtype)
+    colors[:] = sparse["default"]
+    if "runs" in sparse:
+        runs = np.asarray(sparse["runs"], dtype=np.int64).reshape(-1, 2)
+        # expand runs into indices with a single cumulative sum of steps
+        steps = np.ones(runs[:, 1].sum(), dtype=np.int64)
+        if len(steps):
+            runStarts = np.cumsum(runs[:-1, 1])  # positions of the first index of each run after the first
+            steps[runStarts] = runs[1:, 0] - (runs[:-1, 0] + runs[:-1, 1]) + 1
+            steps[0] = runs[0, 0]
+        indices = np.cumsum(steps)
+    else:
+        indices = np.asarray(sparse["indices"], dtype=np.int64)
+    colors[indices] = np.asarray(sparse["values"], dtype=dtype).reshape(-1, 4)
+    return colors
 
-    # load json file
-    with open(path, 'r') as f:
-        shapeDict = json.load(f)
 
-    # assign vertex color parameters on each shape
-    for shape in shapeDict:
-        print("Importing parameters to {0}".format(shape))
-        shapeName = "{0}".format(shape)
-        if namespace:
-            shapeName = "{0}:{1}".format(namespace, shapeName)
+def getTopologyFingerprint(shape):
+    """
+    Gets a fingerprint of the topology of a mesh, which is independent of its name, transform and vertex positions
+    Args:
+        shape (str): Name of the mesh shape
+    Returns:
+        (str): "vertexCount:faceCount:hash", the hash covering the vertex count of each face and their vertex indices
+    """
+    fnMesh = om.MFnMesh(getMObject(shape))
+    polygonCounts, polygonConnects = fnMesh.getVertices()
+    connectivity = hashlib.sha1(np.array(polygonCounts, dtype="<i4").tobytes())
+    connectivity.update(np.array(polygonConnects, dtype="<i4").tobytes())
+    return "{0}:{1}:{2}".format(fnMesh.numVertices, fnMesh.numPolygons, connectivity.hexdigest()[:20])
 
-        # check for namespaces
-        if not cmds.objExists(shape) and not namespacePrompt:
-            result = cmds.promptDialog(title='Possible namespace issues',
-                                       message='Some shapes where not found in the scene. Could they be under a different namespace?',
-                                       button=['Change namespace', 'No'], defaultButton='Change namespace', cancelButton='No', dismissString='No')
-            if result == 'Change namespace':
-                namespace = cmds.promptDialog(query=True, text=True)
-                shapeName = "{0}:{1}".format(namespace, shapeName)
-            namespacePrompt = True
 
-        if cmds.objExists(shapeName):
-            oShape = getMObject(shapeName)  # grabs the MObject of the shape
-            fnMesh = om.MFnMesh(oShape)  # access mesh data (oShape can also be replaced by MDagPath)
-            colorSets = cmds.polyColorSet(shapeName, query=True, allColorSets=True)
-            if colorSets == None:
-                colorSets = []
-            for colorSet in shapeDict[shape]:
-                if colorSet not in colorSets:
-                    cmds.polyColorSet(shapeName, newColorSet=colorSet)
-                oVertexColorArray = fnMesh.getVertexColors(colorSet)  # MColorArray
-                vertexListLength = len(oVertexColorArray)
-                vertexIndexArray = list(xrange(vertexListLength))
-                vertexIndex = 0
-                for vertexColor in shapeDict[shape][colorSet]:
-                    oVertexColorArray[vertexIndex] = vertexColor
-                    vertexIndex += 1
-                fnMesh.setCurrentColorSetName(colorSet)
-                fnMesh.setVertexColors(oVertexColorArray, vertexIndexArray)
-        else:
-            logger.debug("No {0} shape exists in the scene".format(shapeName))
-    printInfo("Vertex colors successfully exported from {0}".format(os.path.basename(path)))
+class TopologyIndex(object):
+    """
+    Index of the meshes in the scene keyed by their topology fingerprint, built once to match shapes in constant time
+    """
+    def __init__(self, shapes=None):
+        """
+        Topology index constructor
+        Args:
+            shapes (list): Mesh shapes to index (default: all non-intermediate meshes in the scene)
+        """
+        if shapes is None:
+            shapes = cmds.ls(type="mesh", noIntermediate=True, l=True)
+        self.shapes = dict()  # fingerprint -> list of shapes
+        for shape in shapes:
+            self.shapes.setdefault(getTopologyFingerprint(shape), []).append(shape)
+
+    def match(self, fingerprint, name=""):
+        """
+        Matches a fingerprint to a shape in the index
+        Args:
+            fingerprint (str): Topology fingerprint (see getTopologyFingerprint)
+            name (str): Original name of the shape, used to choose among shapes with the same topology
+        Returns:
+            (str): Matching shape or an empty string if there is no match or the match is ambiguous
+        """
+        candidates = self.shapes.get(fingerprint, [])
+        if len(candidates) > 1:
+            baseName = self.baseName(name)
+            named = [candidate for candidate in candidates if self.baseName(candidate) == baseName]
+            if len(named) != 1:
+                logger.warning("{0} shapes share the topology of {1}, it can't be matched".format(len(candidates), name))
+                return ""
+            candidates = named
+        return candidates[0] if candidates else ""
+
+    @staticmethod
+    def baseName(name):
+        """
+        Gets the leaf name of a node without its namespaces, e.g. |grp|ns:pCubeShape1 -> pCubeShape1
+        Args:
+            name (str): Name of the node
+        Returns:
+            (str): Leaf name without namespaces
+        """
+        return name.split("|")[-1].split(":")[-1]
+
+
+def isVertexColorContainer(path):
+    """
+    Checks if the file at path is a binary vertex color container
+    Args:
+        path (str): Path of the file
+    Returns:
+        (bool): True if the file is a binary vertex color container
+    """
+    with open(path, 'rb') as f:
+        return f.read(len(VTX_COLOR_MAGIC)) == VTX_COLOR_MAGIC
+
+
+def writeVertexColorContainer(shapeDict, path, dtype="float32", topology=None, frames=None, compression="none",
+                              encoding="dense", previous="", workers=None):
+    """
+    Writes vertex colors to a binary container at path
+    The container holds the magic bytes, the byte length of a json header (uint32), the json header and the aligned
+    chunks of little-endian arrays. The header is a table of contents listing the chunk of each shape and color set
+    with its dtype, vertex count, encoding, compression, crc32 checksum, content hash and byte offset (from the start
+    of the first chunk) and length, so that readers can seek directly to the chunks they need.
+    Args:
+        shapeDict (dict): Shape name -> color set name -> (N, 4) RGBA vertex colors or their sparse encoding
+        path (str): Path of the container
+        dtype (str): Float type of the arrays, "float32" or "float16"
+        topology (dict): Shape name -> topology fingerprint (see getTopologyFingerprint), stored in the shape's chunks
+        frames (dict): Shape name -> color set name -> frames of animated sequences, whose colors are
+                       (frames x vertices x RGBA) arrays
+        compression (str): Compression of the chunks, see VTX_COLOR_COMPRESSIONS. Uncompressed chunks are
+                           memory-mapped on import
+        encoding (str): Encoding of the color sets given as arrays, see VTX_COLOR_ENCODINGS
+        previous (str): Path of a previous container whose chunks are reused if their content and format match
+        workers (int): Number of threads hashing, encoding and compressing the chunks (default: number of cpus)
+    Returns:
+        (int): Number of chunks reused from the previous container
+    """
+    topology = topology or {}
+    frames = frames or {}
+    dtype = np.dtype(dtype).newbyteorder("<")
+    if compression not in VTX_COLOR_COMPRESSIONS:
+        cmds.error("Vertex color compression must be one of: {0}".format(", ".join(VTX_COLOR_COMPRESSIONS)))
+    previousChunks = dict()
+    previousData = None
+    if previous:
+        header, previousStart = readVertexColorHeader(previous)
+        previousChunks = dict(((chunk["shape"], chunk["colorSet"]), chunk) for chunk in header["chunks"])
+        if previousChunks:
+            previousData = np.memmap(previous, dtype=np.uint8, mode='r')
+
+    jobs = []
+    for shape in sorted(shapeDict):
+        for colorSet in sorted(shapeDict[shape]):
+            jobs.append((shape, colorSet, shapeDict[shape][colorSet], frames.get(shape, {}).get(colorSet), dtype,
+                         compression, encoding, previousChunks.get((shape, colorSet), {})))
+
+    # hash, encode and compress in parallel (numpy, zlib and hashlib release the GIL), keeping the chunk order
+    chunks = []
+    chunkData = []
+    offset = 0
+    reused = 0
+    pool = ThreadPool(workers or multiprocessing.cpu_count())
+    try:
+        for chunk, data in pool.imap(encodeContainerJob, jobs):
+            if data is None:
+                start = previousStart + chunk["offset"]
+                data = previousData[start:start + chunk["nbytes"]]
+                reused += 1
+            chunk.pop("topology", None)
+            if chunk["shape"] in topology:
+                chunk["topology"] = topology[chunk["shape"]]
+            chunk["offset"] = offset
+            chunks.append(chunk)
+            chunkData.append(data)
+            offset += alignBytes(chunk["nbytes"])
+    finally:
+        pool.terminate()
+    header = json.dumps({"version": VTX_COLOR_VERSION, "chunks": chunks}, separators=(',', ':')).encode("utf-8")
+    dataStart = alignBytes(len(VTX_COLOR_MAGIC) + 4 + len(header))
+
+    writePath = "{0}.tmp".format(path) if previous else path  # the previous container is still being read
+    with open(writePath, 'wb') as f:
+        f.write(VTX_COLOR_MAGIC)
+        f.write(struct.pack("<I", len(header)))
+        f.write(header)
+        for chunk, data in zip(chunks, chunkData):
+            f.seek(dataStart + chunk["offset"])  # gaps are zero-filled
+            f.write(data if isinstance(data, bytes) else data.tobytes())
+    if previous:
+        del chunkData[:]  # release the memory map before replacing its file
+        data = previousData = None
+        if os.path.isfile(path):
+            os.remove(path)
+        os.rename(writePath, path)
+    return reused
+
+
+def encodeContainerJob(job):
+    """
+    Worker job hashing and encoding a chunk of a binary container, unless its previous chunk can be reused
+    Args:
+        job (tuple): (shape, colorSet, colors, frames, dtype, compression, encoding, previousChunk) as gathered by
+                     writeVertexColorContainer()
+    Returns:
+        (tuple): Table of contents entry of the chunk (dict) and its bytes, None if the previous chunk is reused
+    """
+    shape, colorSet, colors, frames, dtype, compression, encoding, previousChunk = job
+    contentHash = hashVertexColors(colors, frames) if isinstance(colors, np.ndarray) else ""
+    chunkFormat = {"dtype": dtype.str, "encoding": encoding, "compression": compression}
+    if contentHash and previousChunk.get("hash") == contentHash and \
+            all(previousChunk.get(key) == value for key, value in chunkFormat.items()):
+        return dict(previousChunk), None
+    chunk, data = encodeContainerChunk(shape, colorSet, colors, dtype, frames, compression, encoding)
+    if contentHash:
+        chunk["hash"] = contentHash
+    return chunk, data
+
+
+def hashVertexColors(colors, frames=None):
+    """
+    Hashes the content of vertex colors, independently of how they are stored
+    Args:
+        colors (ndarray): (N, 4) RGBA vertex colors or (frames x N x RGBA) colors of an animated sequence
+        frames (list): Frames of an animated sequence
+    Returns:
+        (str): Content hash
+    """
+    colors = np.ascontiguousarray(colors, dtype="<f4")
+    contentHash = hashlib.sha1(json.dumps([colors.shape, frames]).encode("utf-8"))
+    contentHash.update(colors.tobytes())
+    return contentHash.hexdigest()
+
+
+def encodeContainerChunk(shape, colorSet, colors, dtype="float32", frames=None, compression="none", encoding="dense"):
+    """
+    Encodes the vertex colors of a color set into a binary container chunk
+    Sparse chunks hold their uint32 indices (or start, length runs) followed by the aligned values
+    Args:
+        shape (str): Name of the shape
+        colorSet (str): Name of the color set
+        colors (ndarray, dict): (N, 4) RGBA vertex colors, their sparse encoding or (frames x N x RGBA) colors
+        dtype (str): Float type of the arrays, "float32" or "float16"
+        frames (list): Frames of an animated sequence
+        compression (str): Compression of the chunk, see VTX_COLOR_COMPRESSIONS
+        encoding (str): Encoding of colors given as an (N, 4) array, see VTX_COLOR_ENCODINGS
+    Returns:
+        (tuple): Table of contents entry of the chunk (dict) without its offset and the chunk's bytes
+    """
+    if compression not in VTX_COLOR_COMPRESSIONS:
+        cmds.error("Vertex color compression must be one of: {0}".format(", ".join(VTX_COLOR_COMPRESSIONS)))
+    dtype = np.dtype(dtype).newbyteorder("<")
+    chunk = {"shape": shape, "colorSet": colorSet, "dtype": dtype.str}
+    if encoding != "dense" and frames is None and not isinstance(colors, dict):
+        colors = encodeSparseColors(colors, rle=encoding == "rle")
+    if isinstance(colors, dict):
+        key = "runs" if "runs" in colors else "indices"
+        indices = np.ascontiguousarray(colors[key], dtype="<u4")
+        values = np.ascontiguousarray(colors["values"], dtype=dtype).reshape(-1, 4)
+        chunk.update({"encoding": "rle" if key == "runs" else "sparse", "count": colors["count"],
+                      "default": list(colors["default"]), "indexCount": indices.size, "valueCount": len(values)})
+        padding = b"\0" * (alignBytes(indices.nbytes) - indices.nbytes)
+        data = indices.tobytes() + padding + values.tobytes()
+    else:
+        values = np.ascontiguousarray(colors, dtype=dtype).reshape(-1, 4)
+        chunk.update({"encoding": "dense", "count": len(values)})
+        if frames is not None:
+            chunk["frames"] = list(frames)
+            chunk["count"] = len(values) // len(frames)
+        data = values.tobytes()
+    chunk["rawBytes"] = len(data)
+    if compression == "zlib":
+        data = zlib.compress(data)
+    chunk.update({"compression": compression, "nbytes": len(data), "crc32": zlib.crc32(data) & 0xffffffff})
+    return chunk, data
+
+
+def readVertexColorContainer(path):
+    """
+    Reads the vertex colors of a binary container at path, memory-mapping its arrays
+    Args:
+        path (str): Path of the container
+    Returns:
+        (dict): Shape name -> color set name -> read-only (N, 4) RGBA array mapped from the file
+    """
+    shapeDict = {}
+    for chunk, colors in iterVertexColorContainer(path):
+        shapeDict.setdefault(chunk["shape"], {})[chunk["colorSet"]] = colors
+    return shapeDict
+
+
+def readVertexColorHeader(path):
+    """
+    Reads the header (table of contents) of a binary container at path
+    Args:
+        path (str): Path of the container
+    Returns:
+        (tuple): Header (dict) and the byte position of the first chunk
+    """
+    with open(path, 'rb') as f:
+        if f.read(len(VTX_COLOR_MAGIC)) != VTX_COLOR_MAGIC:
+            cmds.error("{0} is not a vertex color container".format(path))
+        headerLength = struct.unpack("<I", f.read(4))[0]
+        header = json.loads(f.read(headerLength).decode("utf-8"))
+    if header.get("version", 1) > VTX_COLOR_VERSION:
+        cmds.error("{0} was written by a newer version (container version {1})".format(path, header["version"]))
+    return header, alignBytes(len(VTX_COLOR_MAGIC) + 4 + headerLength)
+
+
+def iterVertexColorContainer(path, shapes=None, colorSets=None, verify=True):
+    """
+    Iterates over the chunks of a binary container at path, memory-mapping their arrays
+    Only the requested chunks are read, chunks failing their checksum are skipped with a warning
+    Args:
+        path (str): Path of the container
+        shapes (list): Only read the chunks of these shape names (default: all shapes)
+        colorSets (list): Only read the chunks of these color sets (default: all color sets)
+        verify (bool): If the checksums of the chunks should be verified
+    Returns:
+        (generator): (chunk, colors) tuples of each header chunk (dict), with its absolute byte "end" in the file,
+                     and its read-only (N, 4) RGBA array mapped from the file (decoded into memory if sparse or
+                     compressed). The colors of animated sequences are dictionaries with their "frames" and the
+                     (frames x vertices x RGBA) "colors"
+    """
+    header, dataStart = readVertexColorHeader(path)
+    chunks = [chunk for chunk in header["chunks"] if (shapes is None or chunk["shape"] in shapes) and
+              (colorSets is None or chunk["colorSet"] in colorSets)]
+    if not chunks:
+        return
+    data = np.memmap(path, dtype=np.uint8, mode='r')
+    for chunk in chunks:
+        start = dataStart + chunk["offset"]
+        chunk["end"] = start + chunk["nbytes"]
+        stored = data[start:chunk["end"]]
+        if verify and "crc32" in chunk and zlib.crc32(stored) & 0xffffffff != chunk["crc32"]:
+            printWarning("{0} of {1} is corrupted in {2}, skipping it".format(chunk["colorSet"], chunk["shape"], path))
+            continue
+        if chunk.get("compression", "none") == "zlib":
+            stored = np.frombuffer(zlib.decompress(stored), dtype=np.uint8)
+        yield chunk, decodeContainerChunk(chunk, stored)
+
+
+def decodeContainerChunk(chunk, data):
+    """
+    Decodes the vertex colors of an uncompressed binary container chunk
+    Args:
+        chunk (dict): Table of contents entry of the chunk
+        data (ndarray): Bytes of the chunk as a uint8 array
+    Returns:
+        (ndarray, dict): Vertex colors, see iterVertexColorContainer()
+    """
+    dtype = np.dtype(chunk["dtype"])
+    if chunk.get("encoding", "dense") == "dense":
+        colors = data.view(dtype).reshape(-1, 4)
+        if "frames" in chunk:
+            colors = {"frames": chunk["frames"], "colors": colors.reshape(len(chunk["frames"]), -1, 4)}
+        return colors
+    indexBytes = chunk["indexCount"] * 4
+    sparse = {"count": chunk["count"], "default": chunk["default"],
+              "values": data[alignBytes(indexBytes):].view(dtype).reshape(-1, 4)}
+    sparse["runs" if chunk["encoding"] == "rle" else "indices"] = data[:indexBytes].view("<u4")
+    return decodeSparseColors(sparse)
+
+
+class VertexColorStream(object):
+    """
+    Iterates over the vertex colors of a json file or binary container, one color set at a time
+    Iterating yields (shape, colorSet, colors) tuples in file order, colors of json files being nested lists and
+    colors of binary containers being read-only arrays mapped from the file
+    """
+    def __init__(self, path, colorSets=None):
+        """
+        Vertex color stream constructor
+        Args:
+            path (str): Path of the json file or binary container
+            colorSets (list): Only yield these color sets (default: all color sets), other chunks of binary containers
+                              are not read at all
+        """
+        self.path = path
+        self.colorSets = colorSets
+        self.size = os.path.getsize(path)
+        self.binary = isVertexColorContainer(path)
+        self.bytesRead = 0
+        self.topology = dict()  # shape -> topology fingerprint of the shapes read so far (binary containers)
+
+    def __iter__(self):
+        if self.binary:
+            return self.iterContainer()
+        return self.iterJSON()
+
+    def position(self):
+        """
+        Returns the number of bytes of the file that have been read so far
+        Returns:
+            (int): Position within the file
+        """
+        return self.bytesRead
+
+    def iterContainer(self):
+        for chunk, colors in iterVertexColorContainer(self.path, colorSets=self.colorSets):
+            self.bytesRead = min(chunk["end"], self.size)
+            if "topology" in chunk:
+                self.topology[chunk["shape"]] = chunk["topology"]
+            yield chunk["shape"], chunk["colorSet"], colors
+
+    def iterJSON(self):
+        with open(self.path, 'rb') as f:
+            stream = JSONStream(f)
+            for shape in stream.iterObject():
+                for colorSet in stream.iterObject():
+                    colors = stream.value()
+                    self.bytesRead = stream.bytesRead
+                    if self.colorSets is None or colorSet in self.colorSets:
+                        yield shape, colorSet, colors
+
+
+class JSONStream(object):
+    """
+    Incremental reader of nested json objects from a file
+    The file is read in blocks and only the value being decoded is held in memory
+    """
+    whitespace = re.compile(r"[ \t\n\r]*")
+
+    def __init__(self, f, blockSize=1 << 20):
+        """
+        JSON stream constructor
+        Args:
+            f (file): File opened in binary mode, positioned at the start of a json value
+            blockSize (int): Minimum number of bytes to read at once
+        """
+        self.file = f
+        self.blockSize = blockSize
+        self.decoder = json.JSONDecoder()
+        self.textDecoder = codecs.getincrementaldecoder("utf-8")()
+        self.buffer = ""
+        self.pos = 0
+        self.bytesRead = 0
+
+    def fill(self):
+        """
+        Reads the next block, at least doubling the unparsed buffer so that decoding large values stays linear
+        Returns:
+            (bool): False if the end of the file was reached
+        """
+        block = self.file.read(max(self.blockSize, len(self.buffer) - self.pos))
+        self.bytesRead += len(block)
+        self.buffer = self.buffer[self.pos:] + self.textDecoder.decode(block, final=not block)
+        self.pos = 0
+        return bool(block)
+
+    def peek(self):
+        """
+        Skips whitespace and returns the next character
+        Returns:
+            (str): Next character, empty at the end of the file
+        """
+        while True:
+            self.pos = self.whitespace.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer) or not self.fill():
+                return self.buffer[self.pos:self.pos + 1]
+
+    def expect(self, character):
+        """
+        Consumes the next character, which must match
+        Args:
+            character (str): Expected character
+        """
+        found = self.peek()
+        if found != character:
+            raise ValueError("Expected '{0}' but found '{1}' in json stream".format(character, found))
+        self.pos += 1
+
+    def value(self):
+        """
+        Decodes the next json value (string, list, object...)
+        Returns:
+            Decoded value
+        """
+        self.peek()
+        while True:
+            try:
+                value, self.pos = self.decoder.raw_decode(self.buffer, self.pos)
+                return value
+            except ValueError:
+                if not self.fill():  # value may be incomplete, read more of it
+                    raise
+
+    def iterObject(self):
+        """
+        Iterates over the keys of the next json object
+        The value of each key must be consumed by the caller (e.g. with value() or iterObject()) before continuing
+        Returns:
+            (generator): Keys (str) of the object
+        """
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(":")
+            yield key
+            if self.peek() == ",":
+                self.pos += 1
+            else:
+                self.expect("}")
+                return
+
+
+def alignBytes(nbytes):
+    """
+    Rounds a number of bytes up to the alignment of binary vertex color containers
+    Args:
+        nbytes (int): Number of bytes
+    Returns:
+        (int): Aligned number of bytes
+    """
+    return -(-nbytes // VTX_COLOR_ALIGN) * VTX_COLOR_ALIGN
 
 
 #    __  __                           _    ____ ___     ____    ___
@@ -885,6 +1868,273 @@ def getMObject(node):
     return oNode
 
 
+def checkNumpy():
+    """
+    Checks that numpy is available within Maya's python interpreter, errors out otherwise
+    """
+    if np is None:
+        cmds.error("This operation requires numpy, please install it for the python interpreter of Maya")
+
+
+class VertexColorCache(object):
+    """
+    Least recently used cache of vertex color arrays keyed by shape and color set, bounded by its size in bytes
+    Entries of a shape are invalidated by Maya callbacks whenever the shape node is dirtied or its attributes change,
+    the callbacks of a shape are removed once none of its arrays are cached
+    """
+    def __init__(self, maxBytes=VTX_COLOR_CACHE_BYTES):
+        self.arrays = collections.OrderedDict()  # (shape, colorSet) -> read-only (N, 4) float32 array, oldest first
+        self.callbacks = dict()  # shape -> list of callback ids
+        self.sceneCallbacks = []
+        self.maxBytes = maxBytes
+        self.nbytes = 0
+
+    def get(self, shape, colorSet):
+        """
+        Gets the vertex colors of a color set, reading them from the shape only if they are not cached
+        Args:
+            shape (str): Name of the shape
+            colorSet (str): Name of the color set
+        Returns:
+            (ndarray): Read-only (N, 4) float32 array with the RGBA vertex colors
+        """
+        key = (shape, colorSet)
+        if key in self.arrays:
+            colors = self.arrays.pop(key)
+            self.arrays[key] = colors  # most recently used
+            return colors
+        fnMesh = om.MFnMesh(getMObject(shape))
+        colors = colorArrayToNumpy(fnMesh.getVertexColors(colorSet))
+        self.add(shape, colorSet, colors)
+        return colors
+
+    def store(self, shape, colorSet, colors):
+        """
+        Stores the vertex colors of a color set, e.g., after writing them into the shape
+        Args:
+            shape (str): Name of the shape
+            colorSet (str): Name of the color set
+            colors (ndarray): (N, 4) float32 array with the RGBA vertex colors
+        """
+        colors = np.array(colors, dtype=np.float32).reshape(-1, 4)  # own copy, callers may keep modifying theirs
+        self.add(shape, colorSet, colors)
+
+    def add(self, shape, colorSet, colors):
+        """
+        Adds an array to the cache, evicting the least recently used arrays that exceed its size
+        Args:
+            shape (str): Name of the shape
+            colorSet (str): Name of the color set
+            colors (ndarray): (N, 4) float32 array owned by the cache
+        """
+        colors.flags.writeable = False
+        self.discard((shape, colorSet))
+        self.watch(shape)
+        self.arrays[(shape, colorSet)] = colors
+        self.nbytes += colors.nbytes
+        while self.nbytes > self.maxBytes and len(self.arrays) > 1:
+            self.discard(next(iter(self.arrays)))
+        # stop watching shapes without cached arrays (evicted or invalidated)
+        cachedShapes = set(key[0] for key in self.arrays)
+        for watchedShape in [watchedShape for watchedShape in self.callbacks if watchedShape not in cachedShapes]:
+            self.forget(watchedShape)
+
+    def discard(self, key):
+        """
+        Discards a cached array
+        Args:
+            key (tuple): Shape and color set of the array
+        """
+        colors = self.arrays.pop(key, None)
+        if colors is not None:
+            self.nbytes -= colors.nbytes
+
+    def watch(self, shape):
+        """
+        Registers the callbacks that invalidate the cached arrays of shape
+        Args:
+            shape (str): Name of the shape
+        """
+        if not self.sceneCallbacks:
+            for message in [om.MSceneMessage.kBeforeNew, om.MSceneMessage.kBeforeOpen]:
+                self.sceneCallbacks.append(om.MSceneMessage.addCallback(message, self.clear))
+        if shape not in self.callbacks:
+            oShape = getMObject(shape)
+            self.callbacks[shape] = [
+                om.MNodeMessage.addNodeDirtyCallback(oShape, self.nodeChanged, shape),
+                om.MNodeMessage.addAttributeChangedCallback(oShape, self.attributeChanged, shape),
+                om.MNodeMessage.addNameChangedCallback(oShape, self.nodeRemoved, shape),
+                om.MNodeMessage.addNodePreRemovalCallback(oShape, self.nodeRemoved, shape)]
+
+    def invalidate(self, shape):
+        """
+        Invalidates all cached arrays of shape
+        Args:
+            shape (str): Name of the shape
+        """
+        for key in [key for key in self.arrays if key[0] == shape]:
+            self.discard(key)
+
+    def forget(self, shape):
+        """
+        Invalidates all cached arrays of shape and removes its callbacks
+        Args:
+            shape (str): Name of the shape
+        """
+        self.invalidate(shape)
+        if shape in self.callbacks:
+            om.MMessage.removeCallbacks(self.callbacks.pop(shape))
+
+    def clear(self, *args):
+        """
+        Clears the cache and removes all its shape callbacks
+        """
+        for shape in list(self.callbacks):
+            self.forget(shape)
+        self.arrays.clear()
+        self.nbytes = 0
+
+    def nodeChanged(self, node, shape):
+        self.invalidate(shape)
+
+    def attributeChanged(self, msg, plug, otherPlug, shape):
+        self.invalidate(shape)
+
+    def nodeRemoved(self, node, *args):
+        self.forget(args[-1])  # shape is always the last argument (client data)
+
+
+vtxColorCache = VertexColorCache()  # shared control set cache
+
+
+def getVertexColorArray(shape, colorSet, vertices=None, cached=True):
+    """
+    Gets the vertex colors of a color set as a contiguous numpy array
+    Args:
+        shape (str): Name of the shape
+        colorSet (str): Name of the color set
+        vertices (list): Only get the colors of these vertex indices (default: all vertices in order)
+        cached (bool): If the colors can be served from (and stored into) the vertex color cache
+    Returns:
+        (ndarray): (N, 4) float32 array with the RGBA vertex colors, which can be freely modified
+    """
+    if cached and (vertices is None or (shape, colorSet) in vtxColorCache.arrays):
+        colors = vtxColorCache.get(shape, colorSet)
+        if vertices is None:
+            return colors.copy()
+        return colors[np.asarray(vertices)]  # fancy indexing returns a copy
+
+    fnMesh = om.MFnMesh(getMObject(shape))
+    oVertexColorArray = fnMesh.getVertexColors(colorSet)  # MColorArray
+    if vertices is None:
+        return colorArrayToNumpy(oVertexColorArray)
+    if isinstance(vertices, np.ndarray):
+        vertices = vertices.tolist()  # API 2.0 expects python ints
+    return colorArrayToNumpy((oVertexColorArray[vertex] for vertex in vertices), len(vertices))
+
+
+def setVertexColorArray(shape, colorSet, colors, vertices=None, undoable=False, cached=True, modifier=None):
+    """
+    Sets the vertex colors of a color set from a numpy array
+    Args:
+        shape (str): Name of the shape
+        colorSet (str): Name of the color set
+        colors (ndarray): (N, 4) float array with the RGBA vertex colors
+        vertices (list): Vertex indices of the colors (default: all vertices in order)
+        undoable (bool): If the colors should be set as an entry in the undo queue, restoring the previous colors
+        cached (bool): If the colors of all vertices should be stored into the vertex color cache
+        modifier (MDGModifier): Modifier creating the polyColorPerVertex node of shapes with construction history
+    """
+    if undoable:
+        colors = np.array(colors, dtype=np.float32)  # own copy for redoing
+        if not cmds.listConnections("{0}.inMesh".format(shape), s=True, d=False):
+            # without construction history, the colors are written into the mesh itself
+            previous = getVertexColorArray(shape, colorSet, vertices)
+            coopUndo.commit(lambda: setVertexColorArray(shape, colorSet, previous, vertices),
+                            lambda: setVertexColorArray(shape, colorSet, colors, vertices))
+            return
+        # with construction history, the colors are set by a new polyColorPerVertex node, created through a modifier
+        # so that undo removes it again instead of each undo/redo adding another node
+        modifier = om.MDGModifier()
+        queued = []
+
+        def redo():
+            if queued:
+                modifier.doIt()  # runs the operations again after undoIt()
+            else:
+                setVertexColorArray(shape, colorSet, colors, vertices, modifier=modifier)
+                queued.append(modifier)
+        coopUndo.commit(modifier.undoIt, redo)
+        return
+    fnMesh = om.MFnMesh(getMObject(shape))
+    allVertices = vertices is None
+    if allVertices:
+        vertices = list(xrange(len(colors)))
+    elif isinstance(vertices, np.ndarray):
+        vertices = vertices.tolist()  # API 2.0 expects a sequence of python ints
+    oVertexColorArray = numpyToColorArray(colors)
+    fnMesh.setCurrentColorSetName(colorSet)
+    fnMesh.setVertexColors(oVertexColorArray, vertices, modifier)
+    if modifier is not None:
+        modifier.doIt()
+    if allVertices and cached:
+        vtxColorCache.store(shape, colorSet, colors)  # the write itself invalidated the shape
+
+
+def colorArrayToNumpy(oColorArray, count=None):
+    """
+    Converts an MColorArray (or any iterable of colors) into a numpy array
+    Python api 2.0 arrays expose no buffer to copy from, so the colors are still iterated one by one, but np.fromiter
+    fills a preallocated float32 array without building intermediate lists
+    Args:
+        oColorArray (MColorArray): Colors to convert
+        count (int): Number of colors, if oColorArray has no length
+    Returns:
+        (ndarray): (N, 4) float32 array with the RGBA colors
+    """
+    if count is None:
+        count = len(oColorArray)
+    flatColors = itertools.chain.from_iterable(oColorArray)  # r, g, b, a, r, g... without intermediate lists
+    return np.fromiter(flatColors, dtype=np.float32, count=count * 4).reshape(-1, 4)
+
+
+def numpyToColorArray(colors):
+    """
+    Converts a numpy array into an MColorArray, handing all rows to a single constructor call
+    Args:
+        colors (ndarray): (N, 4) RGBA colors
+    Returns:
+        (MColorArray): Converted colors
+    """
+    rows = np.asarray(colors, dtype=np.float64).reshape(-1, 4).tolist()
+    try:
+        return om.MColorArray(rows)  # elements are converted within the API
+    except (TypeError, ValueError):
+        return om.MColorArray([om.MColor(row) for row in rows])
+
+
+def getComponentVertices(components):
+    """
+    Gets the vertex indices of vertex or face components as compact arrays, per shape
+    Args:
+        components (list): List of components (str), e.g. ["pCube1.vtx[0:199]", "pSphere1.f[3]"]
+    Returns:
+        (dict): Shape name (str) -> sorted (K,) int32 array of unique vertex indices
+    """
+    vertices = cmds.polyListComponentConversion(components, toVertex=True) or []  # compact ranges, e.g. vtx[0:199]
+    selectionList = om.MSelectionList()
+    for vertex in vertices:
+        selectionList.add(vertex)
+
+    shapeVertices = dict()
+    for index in xrange(selectionList.length()):
+        dagPath, component = selectionList.getComponent(index)
+        dagPath.extendToShape()
+        elements = om.MFnSingleIndexedComponent(component).getElements()
+        shapeVertices.setdefault(dagPath.partialPathName(), []).append(np.array(elements, dtype=np.int32))
+    return dict((shape, np.unique(np.concatenate(arrays))) for shape, arrays in shapeVertices.items())
+
+
 def printInfo(info):
     """
     Prints the information statement in the command response (to the right of the command line)
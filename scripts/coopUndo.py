@@ -0,0 +1,87 @@
+"""
+@license:       MIT
+@repository:    https://github.com/semontesdeoca/maya-coop
+#                          _   _           _
+#     ___ ___   ___  _ __ | | | |_ __   __| | ___
+#    / __/ _ \ / _ \| '_ \| | | | '_ \ / _` |/ _ \
+#   | (_| (_) | (_) | |_) | |_| | | | | (_| | (_) |
+#    \___\___/ \___/| .__/ \___/|_| |_|\__,_|\___/
+#                   |_|
+@summary:       Undoable python api operations
+                Python api edits (e.g., MDGModifier, MFnMesh) don't register in the undo queue outside of a command,
+                this module is also a plugin with a command that registers them
+@run:           import coopUndo; coopUndo.commit(undo, redo)
+"""
+from __future__ import print_function
+import os, sys, types
+import maya.cmds as cmds
+import maya.api.OpenMaya as om  # python api 2.0
+
+maya_useNewAPI = True  # python api 2.0 plugin
+COMMAND = "coopUndo"
+PLUGIN = os.path.splitext(os.path.abspath(__file__))[0] + ".py"  # not the compiled .pyc python 2 imports from
+
+# Maya loads plugins as a separate module, the pending operation is shared through a module of its own
+shared = sys.modules.setdefault("coopUndoShared", types.ModuleType("coopUndoShared"))
+if not hasattr(shared, "pending"):
+    shared.pending = None
+
+
+def commit(undo, redo):
+    """
+    Runs an operation and registers it as a single entry in the undo queue
+    Args:
+        undo (function): Function without arguments that reverts the operation
+        redo (function): Function without arguments that performs the operation
+    """
+    if not cmds.pluginInfo(PLUGIN, q=True, loaded=True):
+        cmds.loadPlugin(PLUGIN, quiet=True)
+    shared.pending = (undo, redo)
+    try:
+        getattr(cmds, COMMAND)()
+    finally:
+        shared.pending = None
+
+
+#                                                   _
+#     ___ ___  _ __ ___  _ __ ___   __ _ _ __   __| |
+#    / __/ _ \| '_ ` _ \| '_ ` _ \ / _` | '_ \ / _` |
+#   | (_| (_) | | | | | | | | | | | (_| | | | | (_| |
+#    \___\___/|_| |_| |_|_| |_| |_|\__,_|_| |_|\__,_|
+#
+class UndoCommand(om.MPxCommand):
+    """
+    Command running the pending operation of commit(), undone and redone by Maya
+    """
+    def __init__(self):
+        super(UndoCommand, self).__init__()
+        self.undo = None
+        self.redo = None
+
+    def doIt(self, args):
+        if shared.pending is None:
+            raise RuntimeError("{0} runs operations committed through coopUndo.commit()".format(COMMAND))
+        self.undo, self.redo = shared.pending
+        shared.pending = None
+        self.redo()
+
+    def undoIt(self):
+        self.undo()
+
+    def redoIt(self):
+        self.redo()
+
+    def isUndoable(self):
+        return True
+
+    @staticmethod
+    def creator():
+        return UndoCommand()
+
+
+def initializePlugin(plugin):
+    om.MFnPlugin(plugin).registerCommand(COMMAND, UndoCommand.creator)
+
+
+def uninitializePlugin(plugin):
+    om.MFnPlugin(plugin).deregisterCommand(COMMAND)
@@ -99,6 +99,10 @@ logger.setLevel(logging.DEBUG)  # defines the logging level (INFO for releases)
 #          - charcoal  : mixing
 #
 # ===========================================================================================
+# general channel meanings of the schema (RGBA)
+SCHEMA = {"controlSetA": ["pigment variation", "pigment application", "pigment density", "detail"],
+          "controlSetB": ["substrate distortion", "u-inclination", "v-inclination", "shape"],
+          "controlSetC": ["edge intensity", "edge width", "edge transition", "blending"]}
 
 
 # MNPR FX class
@@ -286,13 +290,35 @@ class MNPR_FX_UI(qt.CoopMayaUI):
         vertexImportBtn = QtWidgets.QPushButton("import")
         vertexHeaderLayout.addWidget(vertexImportBtn, QtCore.Qt.AlignRight)
         vertexImportBtn.setMaximumWidth(45 * self.dpiS)
-        vertexImportBtn.setToolTip("Import painted effects")
-        vertexImportBtn.clicked.connect(lambda: pFX.importPaintFX())
+        vertexImportBtn.setToolTip("Import painted effects (right-click for sequences and effects to restore)")
+        vertexImportBtn.clicked.connect(lambda: pFX.importPaintFX(colorSets=self.importColorSets()))
+        vertexImportBtn.setContextMenuPolicy(QtCore.Qt.ActionsContextMenu)
+        importSequenceAction = QtWidgets.QAction("Import animated sequence...", vertexImportBtn)
+        importSequenceAction.triggered.connect(lambda: pFX.importPaintFXSequence(colorSets=self.importColorSets()))
+        vertexImportBtn.addAction(importSequenceAction)
+        self.importColorSetActions = []
+        for colorSet in pFX.CONTROL_SETS:
+            colorSetAction = QtWidgets.QAction("Restore {0} ({1})".format(colorSet, ", ".join(SCHEMA[colorSet])),
+                                               vertexImportBtn)
+            colorSetAction.setCheckable(True)
+            colorSetAction.setChecked(True)
+            colorSetAction.setData(colorSet)
+            vertexImportBtn.addAction(colorSetAction)
+            self.importColorSetActions.append(colorSetAction)
         vertexExportBtn = QtWidgets.QPushButton("export")
         vertexHeaderLayout.addWidget(vertexExportBtn, QtCore.Qt.AlignRight)
         vertexExportBtn.setMaximumWidth(45 * self.dpiS)
-        vertexExportBtn.setToolTip("Export painted effects")
+        vertexExportBtn.setToolTip("Export painted effects (right-click for sequences)")
         vertexExportBtn.clicked.connect(lambda: pFX.exportPaintFX())
+        vertexExportBtn.setContextMenuPolicy(QtCore.Qt.ActionsContextMenu)
+        exportSequenceAction = QtWidgets.QAction("Export animated sequence (playback range)...", vertexExportBtn)
+        exportSequenceAction.triggered.connect(lambda: pFX.exportPaintFXSequence())
+        vertexExportBtn.addAction(exportSequenceAction)
+        vertexStatsBtn = QtWidgets.QPushButton("stats")
+        vertexHeaderLayout.addWidget(vertexStatsBtn, QtCore.Qt.AlignRight)
+        vertexStatsBtn.setMaximumWidth(45 * self.dpiS)
+        vertexStatsBtn.setToolTip("Statistics of painted effects in selected objects (or the scene)")
+        vertexStatsBtn.clicked.connect(lambda: ControlStatsUI(rebuild=True))
 
         vertexSpaceLayout.addWidget(qt.HLine())  # separator
 
@@ -306,6 +332,76 @@ class MNPR_FX_UI(qt.CoopMayaUI):
         # footer
         self.layout.addWidget(self.brand)
 
+    def importColorSets(self):
+        """
+        Returns the control sets checked to be restored on import
+        Returns:
+            (list): Control sets (str), or None to restore all color sets if all control sets are checked
+        """
+        colorSets = [action.data() for action in self.importColorSetActions if action.isChecked()]
+        if not colorSets:
+            cmds.error("No control sets are checked to be restored, check them in the right-click menu of import")
+        if len(colorSets) == len(self.importColorSetActions):
+            return None
+        return colorSets
+
+
+#        _        _         _   _ ___
+#    ___| |_ __ _| |_ ___  | | | |_ _|
+#   / __| __/ _` | __/ __| | | | || |
+#   \__ \ || (_| | |_\__ \ | |_| || |
+#   |___/\__\__,_|\__|___/  \___/|___|
+#
+class ControlStatsUI(qt.CoopMayaUI):
+    """
+    Report UI with the statistics of the painted control parameters of the selected objects (or the scene)
+    """
+    windowTitle = "mnprFX stats"
+    sparks = u"\u2581\u2582\u2583\u2584\u2585\u2586\u2587\u2588"  # histogram bars
+
+    def __init__(self, rebuild=False):
+        super(ControlStatsUI, self).__init__(self.windowTitle, dock=False, rebuild=rebuild, brand=mnpr_info.brand, tooltip="Statistics of painted effects")
+
+    def buildUI(self):
+        self.setGeometry(300, 300, 720 * self.dpiS, 480 * self.dpiS)
+        self.tree = QtWidgets.QTreeWidget()
+        self.tree.setHeaderLabels(["shape / effect", "min", "max", "mean", "p5", "p50", "p95", "histogram [-1:1]"])
+        self.tree.setColumnWidth(0, 220 * self.dpiS)
+        self.layout.addWidget(self.tree)
+        self.layout.addWidget(self.brand)
+
+    def populateUI(self):
+        selected = cmds.ls(sl=True)
+        shapes = lib.getShapes(selected, l=True, quiet=True) if selected else None
+        stats = pFX.controlStatistics(shapes)
+        for shape in sorted(stats):
+            shapeItem = QtWidgets.QTreeWidgetItem(self.tree, [shape.split("|")[-1]])
+            shapeItem.setToolTip(0, shape)
+            for colorSet in pFX.CONTROL_SETS:
+                colorSetStats = stats[shape].get(colorSet)
+                if not colorSetStats or not colorSetStats["vertices"]:
+                    continue
+                colorSetItem = QtWidgets.QTreeWidgetItem(shapeItem, ["{0} ({1} vertices)".format(colorSet, colorSetStats["vertices"])])
+                for channel in range(4):
+                    values = [colorSetStats["min"][channel], colorSetStats["max"][channel], colorSetStats["mean"][channel]]
+                    values.extend(colorSetStats["percentiles"][:, channel])
+                    columns = [SCHEMA[colorSet][channel]] + ["{0:.3f}".format(value) for value in values]
+                    columns.append(self.sparkline(colorSetStats["histogram"][channel]))
+                    QtWidgets.QTreeWidgetItem(colorSetItem, columns)
+            if shape == pFX.SCENE_STATS:
+                shapeItem.setExpanded(True)
+
+    def sparkline(self, histogram):
+        """
+        Draws a histogram as a line of bar characters
+        Args:
+            histogram (ndarray): Counts of each bin
+        Returns:
+            (str): Histogram bars
+        """
+        peak = float(max(histogram.max(), 1))
+        return u"".join(self.sparks[int(round(count / peak * (len(self.sparks) - 1)))] for count in histogram)
+
 
 #                _       _              _     _            _
 #    _ __   __ _(_)_ __ | |_  __      _(_) __| | __ _  ___| |_
@@ -523,6 +619,8 @@ class NoiseWidget(QtWidgets.QWidget):
         self.shiftSlider.setRange(-100, 100)
         self.shiftSlider.valueChanged.connect(lambda: nFX.noiseShift(self.fx, self.shiftSlider))
         self.shiftSlider.sliderPressed.connect(lambda: nFX.selectMaterials())
+        self.shiftSlider.sliderPressed.connect(lambda: nFX.noiseScheduler.begin())
+        self.shiftSlider.sliderReleased.connect(lambda: nFX.noiseScheduler.commit())
 
         """ SIGNALS """
         noiseBtn.clicked.connect(lambda: mnpr_system.showShaderAttr())
@@ -590,3 +688,5 @@ class LabeledSlider(QtWidgets.QWidget):
         layout.addWidget(self.slider, 0, 1)
 
         self.slider.sliderPressed.connect(lambda: nFX.selectMaterials())
+        self.slider.sliderPressed.connect(lambda: nFX.noiseScheduler.begin())
+        self.slider.sliderReleased.connect(lambda: nFX.noiseScheduler.commit())
@@ -0,0 +1,235 @@
+"""
+@license:       MIT
+@repository:    https://github.com/semontesdeoca/MNPR
+     _           _       _
+    | |__   __ _| |_ ___| |__
+    | '_ \ / _` | __/ __| '_ \
+    | |_) | (_| | || (__| | | |
+    |_.__/ \__,_|\__\___|_| |_|
+
+@summary:       Headless batch transfer of PaintFX control parameters across scene files
+@run:           mayapy mnpr_batch.py manifest.json [--workers 4] [--report report.json]
+
+Manifest (json), relative paths are resolved from the directory of the manifest:
+{
+    "workers": 4,
+    "jobs": [
+        {"scene": "shots/sh010.mb", "action": "export", "path": "params/sh010.vcb", "objects": ["char_GRP"]},
+        {"scene": "shots/sh020.mb", "action": "import", "path": "params/sh010.vcb", "match": "topology",
+         "output": "shots/sh020_params.mb"}
+    ]
+}
+Export options: objects (default: all meshes), dtype, encoding, namespace, compression and incremental
+                (see coopLib.exportVertexColors)
+Import options: match, namespace and colorSets (see coopLib.importVertexColors), output (path to save the scene
+                with the imported parameters as) and save (overwrite the scene, default: false)
+Jobs run in parallel, but all exports finish before the first import starts
+
+Maya is only imported within the jobs, so a stand-in maya package on the path can replace it
+"""
+from __future__ import print_function
+import os, sys, json, time, logging, argparse, traceback, multiprocessing
+
+# LOGGING
+logging.basicConfig()  # errors and everything else (2 separate log groups)
+logger = logging.getLogger("mnpr_batch")  # create a logger for this file
+logger.setLevel(logging.INFO)  # defines the logging level (INFO for releases)
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+ACTIONS = ["export", "import"]
+JOB_DEFAULTS = {"export": {"objects": None, "dtype": "float32", "encoding": None, "namespace": False,
+                           "compression": "zlib", "incremental": True},
+                "import": {"match": "name", "namespace": "", "colorSets": None, "output": "",
+                           "save": False}}
+
+
+#                          _  __           _
+#    _ __ ___   __ _ _ __ (_)/ _| ___  ___| |_
+#   | '_ ` _ \ / _` | '_ \| | |_ / _ \/ __| __|
+#   | | | | | | (_| | | | | |  _|  __/\__ \ |_
+#   |_| |_| |_|\__,_|_| |_|_|_|  \___||___/\__|
+#
+def readManifest(path):
+    """
+    Reads and validates a batch manifest, resolving its paths and filling in the job defaults
+    Args:
+        path (str): Path of the manifest (json)
+    Returns:
+        (dict): Manifest with its "jobs"
+    Raises:
+        ValueError: If the manifest is not valid
+    """
+    with open(path, 'r') as f:
+        manifest = json.load(f)
+    if not isinstance(manifest, dict) or not isinstance(manifest.get("jobs"), list):
+        raise ValueError("{0} has no list of jobs".format(path))
+
+    root = os.path.dirname(os.path.abspath(path))
+    jobs = []
+    for index, job in enumerate(manifest["jobs"]):
+        action = job.get("action")
+        if action not in ACTIONS:
+            raise ValueError("Job {0} has no valid action, must be one of: {1}".format(index, ", ".join(ACTIONS)))
+        for key in ["scene", "path"]:
+            if not job.get(key):
+                raise ValueError("Job {0} has no {1}".format(index, key))
+        unknown = set(job) - set(JOB_DEFAULTS[action]) - {"action", "scene", "path"}
+        if unknown:
+            raise ValueError("Job {0} has unknown options: {1}".format(index, ", ".join(sorted(unknown))))
+        resolved = dict(JOB_DEFAULTS[action])
+        resolved.update(job)
+        resolved["scene"] = os.path.normpath(os.path.join(root, job["scene"]))
+        resolved["path"] = os.path.normpath(os.path.join(root, job["path"]))
+        if resolved.get("output"):
+            resolved["output"] = os.path.normpath(os.path.join(root, job["output"]))
+        jobs.append(resolved)
+    manifest["jobs"] = jobs
+    return manifest
+
+
+#                       _
+#   __      _____  _ __| | _____ _ __ ___
+#   \ \ /\ / / _ \| '__| |/ / _ \ '__/ __|
+#    \ V  V / (_) | |  |   <  __/ |  \__ \
+#     \_/\_/ \___/|_|  |_|\_\___|_|  |___/
+#
+def initializeWorker():
+    """
+    Initializes Maya in a worker process
+    """
+    if SCRIPTS_DIR not in sys.path:
+        sys.path.insert(0, SCRIPTS_DIR)
+    try:
+        import maya.standalone
+    except ImportError:
+        return  # stand-in maya package
+    import maya.cmds as cmds
+    if not hasattr(cmds, "about"):  # commands only exist once Maya is initialized
+        maya.standalone.initialize(name="python")
+
+
+def runJob(job):
+    """
+    Runs a single export or import job in the current Maya session
+    Args:
+        job (dict): Job of a manifest read by readManifest()
+    Returns:
+        (dict): Result with the job's "scene", "action" and "path", its "status" ("ok" or "failed"), the "shapes" it
+                exported or imported, its duration in "seconds" and the "error" traceback if it failed
+    """
+    import maya.cmds as cmds
+    import coopLib as lib
+
+    result = {"scene": job["scene"], "action": job["action"], "path": job["path"],
+              "status": "ok", "shapes": [], "seconds": 0.0, "error": ""}
+    start = time.time()
+    try:
+        cmds.file(job["scene"], open=True, force=True)
+        if job["action"] == "export":
+            objects = job["objects"] or cmds.ls(type="mesh", noIntermediate=True, l=True)
+            result["shapes"] = lib.exportVertexColors(objects, job["path"], job["dtype"], job["encoding"],
+                                                      job["namespace"], job["compression"], job["incremental"])
+        else:
+            result["shapes"] = lib.importVertexColors(job["path"], job["match"], job["namespace"],
+                                                      colorSets=job["colorSets"])
+            if job["output"]:
+                fileType = "mayaAscii" if job["output"].lower().endswith(".ma") else "mayaBinary"
+                cmds.file(rename=job["output"])
+                cmds.file(save=True, force=True, type=fileType)
+            elif job["save"]:
+                cmds.file(save=True, force=True)
+    except Exception:
+        result["status"] = "failed"
+        result["error"] = traceback.format_exc()
+    result["seconds"] = round(time.time() - start, 3)
+    logger.info("{0} {1} {2}: {3}".format(result["action"], result["scene"], result["path"], result["status"]))
+    return result
+
+
+def runBatch(manifest, workers=None, reportPath=""):
+    """
+    Runs the jobs of a manifest in a pool of mayapy worker processes and writes a summary report
+    Args:
+        manifest (dict): Manifest read by readManifest()
+        workers (int): Number of worker processes, 0 runs the jobs in this process
+                       (default: the manifest's "workers" or the number of cpus)
+        reportPath (str): Path to write the report to (json)
+    Returns:
+        (dict): Report with the "results" of each job in manifest order, the number of "succeeded" and "failed"
+                jobs and the total "seconds"
+    """
+    jobs = manifest["jobs"]
+    if workers is None:
+        workers = manifest.get("workers", multiprocessing.cpu_count())
+    start = time.time()
+    results = [None] * len(jobs)
+    if workers < 1 or not jobs:
+        initializeWorker()
+        mapJobs = map
+    else:
+        # spawned workers, forking an (interactive) Maya session is not safe
+        context = multiprocessing.get_context("spawn") if hasattr(multiprocessing, "get_context") else multiprocessing
+        if hasattr(context, "set_executable"):
+            context.set_executable(mayapyExecutable())
+        pool = context.Pool(min(workers, len(jobs)), initializer=initializeWorker)
+        mapJobs = lambda function, phaseJobs: pool.map(function, phaseJobs, chunksize=1)
+    try:
+        # all exports finish before any import, so imports can use files exported by the same manifest
+        for action in ACTIONS:
+            indices = [index for index, job in enumerate(jobs) if job["action"] == action]
+            for index, result in zip(indices, mapJobs(runJob, [jobs[index] for index in indices])):
+                results[index] = result
+    finally:
+        if mapJobs is not map:
+            pool.close()
+            pool.join()
+
+    failed = len([result for result in results if result["status"] != "ok"])
+    report = {"results": results, "succeeded": len(results) - failed, "failed": failed,
+              "seconds": round(time.time() - start, 3)}
+    if reportPath:
+        with open(reportPath, 'w') as f:
+            json.dump(report, f, indent=2)
+    logger.info("{0} jobs succeeded and {1} failed in {2}s".format(report["succeeded"], failed, report["seconds"]))
+    return report
+
+
+def mayapyExecutable():
+    """
+    Gets the python interpreter for worker processes, mayapy instead of the Maya application
+    Returns:
+        (str): Path of the interpreter
+    """
+    executable = sys.executable
+    name = os.path.basename(executable).lower()
+    if name.startswith("maya") and not name.startswith("mayapy"):
+        mayapy = os.path.join(os.path.dirname(executable), "mayapy")
+        if sys.platform == "win32":
+            mayapy += ".exe"
+        if os.path.isfile(mayapy):
+            return mayapy
+    return executable
+
+
+def main(argv=None):
+    """
+    Command line entry point
+    Args:
+        argv (list): Command line arguments (default: sys.argv)
+    Returns:
+        (int): Exit code, 1 if any job failed
+    """
+    parser = argparse.ArgumentParser(description="Batch export/import of PaintFX control parameters")
+    parser.add_argument("manifest", help="json manifest of scene files and parameter files")
+    parser.add_argument("--workers", type=int, default=None, help="number of mayapy workers, 0 runs in this process")
+    parser.add_argument("--report", default="", help="path of the json report (default: next to the manifest)")
+    args = parser.parse_args(argv)
+
+    manifest = readManifest(args.manifest)
+    reportPath = args.report or "{0}_report.json".format(os.path.splitext(args.manifest)[0])
+    report = runBatch(manifest, args.workers, reportPath)
+    return 1 if report["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+"""
+@license:       MIT
+@repository:    https://github.com/semontesdeoca/MNPR
+     _                        _
+    | | _____ _ __ _ __   ___| |___
+    | |/ / _ \ '__| '_ \ / _ \ / __|
+    |   <  __/ |  | | | |  __/ \__ \
+    |_|\_\___|_|  |_| |_|\___|_|___/
+
+@summary:       Maya-independent array kernels for the vertex control parameters
+                All kernels work on (N, 4) RGBA float arrays and return new arrays
+"""
+from __future__ import print_function
+
+try:
+    import numpy as np  # not shipped with every Maya version
+except ImportError:
+    np = None
+
+
+#              _                 _   _
+#    _ __ ___ (_) __ _ _ __ __ _| |_(_) ___  _ __
+#   | '_ ` _ \| |/ _` | '__/ _` | __| |/ _ \| '_ \
+#   | | | | | | | (_| | | | (_| | |_| | (_) | | | |
+#   |_| |_| |_|_|\__, |_|  \__,_|\__|_|\___/|_| |_|
+#                |___/
+def translateControlSetA(colors, v1=False):
+    """
+    Translates legacy pigment control parameters (controlSetA) to the current parametrization scheme
+    Args:
+        colors (ndarray): (N, 4) RGBA array of controlSetA
+        v1 (bool): If the parameters come from the first prototype
+    Returns:
+        (ndarray): Translated (N, 4) float32 array
+    """
+    colors = np.array(colors, dtype=np.float32).reshape(-1, 4)
+    if v1:
+        colors[:, 0] = 0.5
+        colors[:, 1] = np.clip(2.5 * colors[:, 1], 0.4, 1.0)
+        colors[:, 2] = np.minimum((1.0 - colors[:, 3]) * 1.2, 1.0)
+        colors[:, 3] = 0.0
+    colors[:, 0] = 0.0
+    colors[:, 1] = (colors[:, 1] - 0.5) * 2.0
+    colors[:, 2] = (colors[:, 2] - 0.6) * 1.67
+    return colors
+
+
+def translateControlSetB(colors, v1=False):
+    """
+    Translates legacy substrate control parameters (controlSetB) to the current parametrization scheme
+    Args:
+        colors (ndarray): (N, 4) RGBA array of controlSetB
+        v1 (bool): If the parameters come from the first prototype
+    Returns:
+        (ndarray): Translated (N, 4) float32 array
+    """
+    colors = np.array(colors, dtype=np.float32).reshape(-1, 4)
+    if v1:
+        colors[:, 0] = np.minimum(2.0 * colors[:, 0], 1.0)
+        colors[:, 1] = 0.5
+        colors[:, 2] = 0.5
+        colors[:, 3] = 0.0
+    colors[:, 0] = (colors[:, 0] - 0.2) * 1.25
+    colors[:, 1] = 0.0
+    colors[:, 2] = 0.0
+    return colors
+
+
+def translateControlSetC(colors, v1=False):
+    """
+    Translates legacy edge control parameters (controlSetC) to the current parametrization scheme
+    Args:
+        colors (ndarray): (N, 4) RGBA array of controlSetC
+        v1 (bool): If the parameters come from the first prototype
+    Returns:
+        (ndarray): Translated (N, 4) float32 array
+    """
+    colors = np.array(colors, dtype=np.float32).reshape(-1, 4)
+    if v1:
+        colors[:, 0] = 0.2
+        colors[:, 1] = 0.5
+        colors[:, 2] = np.maximum((colors[:, 2] - 0.5) * 2.0, 0.0)
+        colors[:, 3] = 0.5
+    colors[:, 0] = (colors[:, 0] - 0.2) * 1.25
+    colors[:, 1] = (colors[:, 1] - 0.5) * 2.0
+    blue = colors[:, 2].copy()
+    colors[:, 2] = (colors[:, 3] - 0.5) * 2.0  # alpha and blue are swapped
+    colors[:, 3] = np.maximum((blue - 0.5) * 2.0, 0.0)
+    return colors
+
+
+def translateControlSets(controlSetA, controlSetB, controlSetC, v1=False):
+    """
+    Translates legacy control parameters of all control sets to the current parametrization scheme
+    Args:
+        controlSetA (ndarray): (N, 4) RGBA array of controlSetA
+        controlSetB (ndarray): (N, 4) RGBA array of controlSetB
+        controlSetC (ndarray): (N, 4) RGBA array of controlSetC
+        v1 (bool): If the parameters come from the first prototype
+    Returns:
+        (tuple): Translated (controlSetA, controlSetB, controlSetC) float32 arrays
+    """
+    return (translateControlSetA(controlSetA, v1),
+            translateControlSetB(controlSetB, v1),
+            translateControlSetC(controlSetC, v1))
@@ -159,7 +159,7 @@ def createMaterial(objs, name="mnprMat_SFX", prototype="shaderFX", graph="mnpr_u
     shader = ""
     if prototype == "shaderFX":
         shader = cmds.shadingNode('ShaderfxShader', asShader=True, name=name)
-        cmds.shaderfx(sfxnode=shader, loadGraph=shaderFile)
+        lib.loadGraph(shader, shaderFile)
     else:
         if os.name == 'nt' and mnpr_info.backend == 'dx11':
             shader = cmds.shadingNode('dx11Shader', asShader=True, n=newName)
@@ -428,7 +428,7 @@ class MnprMaterialLibrary(dict):
                 mat = createMaterial([xform[0]], graph=graph)
             elif graph != prevGraph:
                 shaderFile = os.path.join(mnpr_info.environment, "shaders", "{0}.sfx".format(graph))
-                cmds.shaderfx(sfxnode=mat, loadGraph=shaderFile)
+                lib.loadGraph(mat, shaderFile)
 
         # default lighting in case there are no lights
         defaultLighting()
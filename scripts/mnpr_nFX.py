@@ -11,7 +11,9 @@
                 NoiseFX is responsible for the material effect control
 """
 from __future__ import print_function
+import struct
 import maya.cmds as cmds
+import maya.api.OpenMaya as om  # python api 2.0
 import coopLib as lib
 
 
@@ -40,15 +42,15 @@ class FxNodes:
 
     def refreshIds(self, mat):
         """
-            Store the node IDs of the FX nodes
+            Store the node IDs of the FX nodes (memoized per material)
         Args:
             mat (str): Material name to get node ids from
         """
-        self.scale = cmds.shaderfx(sfxnode=mat, getNodeIDByName=self.scaleNodeName)
-        self.intensity = cmds.shaderfx(sfxnode=mat, getNodeIDByName=self.intensityNodeName)
-        self.shift = cmds.shaderfx(sfxnode=mat, getNodeIDByName=self.shiftNodeName)
-        self.state = cmds.shaderfx(sfxnode=mat, getNodeIDByName=self.stateNodeName)
-        self.type = cmds.shaderfx(sfxnode=mat, getNodeIDByName=self.typeNodeName)
+        self.scale = lib.sfxNodeIds.get(mat, self.scaleNodeName)
+        self.intensity = lib.sfxNodeIds.get(mat, self.intensityNodeName)
+        self.shift = lib.sfxNodeIds.get(mat, self.shiftNodeName)
+        self.state = lib.sfxNodeIds.get(mat, self.stateNodeName)
+        self.type = lib.sfxNodeIds.get(mat, self.typeNodeName)
 
 
 def getId(mat, uniqueNodeName):
@@ -60,9 +62,7 @@ def getId(mat, uniqueNodeName):
     Returns:
         (int): Node id in ShaderFX graph
     """
-    nodeId = cmds.shaderfx(sfxnode=mat, getNodeIDByName=uniqueNodeName)
-
-    return nodeId
+    return lib.sfxNodeIds.get(mat, uniqueNodeName)  # memoized per material
 
 
 #########################################################################################################
@@ -141,6 +141,271 @@ controlNodes["controlSetC"] = [intensityIds, widthIds, fidelityIds, blendingIds]
 # ===========================================================================================
 
 
+#########################################################################################################
+# SHADER PERMUTATIONS
+# Procedural states and noise types are static switches, each unique combination compiles into its own shader
+class ShaderPermutations(object):
+    """
+    Memoized static switch states of ShaderFX materials, grouping materials into the shader permutations they compile
+    ShaderFX compiles each material separately, so switches are only edited in materials where they differ
+    Materials are forgotten when they are removed or a new graph is loaded into them and all are forgotten when a
+    scene is opened
+    """
+    def __init__(self):
+        self.switches = dict()  # material -> dict of switch node name -> state
+        self.callbacks = []
+
+    @staticmethod
+    def switchNodeNames():
+        """
+        Gets the unique ShaderFX node names of all procedural switches
+        Returns:
+            (list): Sorted list of node names
+        """
+        nodeNames = set()
+        for fxNodes in controlNodes.values():
+            for nodes in fxNodes:
+                nodeNames.update([nodes.stateNodeName, nodes.typeNodeName])
+        return sorted(nodeNames)
+
+    def get(self, mat, nodeName):
+        """
+        Gets the state of a switch in a material, looking it up only if it is not memoized
+        Args:
+            mat (str): ShaderFX material
+            nodeName (str): Unique ShaderFX node name of the switch
+        Returns:
+            (bool): State of the switch, None if the graph of the material has no such switch
+        """
+        switches = self.switches.setdefault(mat, dict())
+        if nodeName not in switches:
+            if not self.callbacks:
+                self.callbacks = [om.MDGMessage.addNodeRemovedCallback(self.nodeRemoved),
+                                  om.MSceneMessage.addCallback(om.MSceneMessage.kBeforeOpen, self.reset),
+                                  om.MSceneMessage.addCallback(om.MSceneMessage.kBeforeNew, self.reset)]
+                lib.sfxNodeIds.graphCallbacks.append(self.forget)
+            try:
+                switches[nodeName] = bool(cmds.shaderfx(sfxnode=mat, getPropertyValue=(getId(mat, nodeName), "value")))
+            except RuntimeError:
+                switches[nodeName] = None
+        return switches[nodeName]
+
+    def key(self, mat):
+        """
+        Gets the permutation a material compiles into
+        Args:
+            mat (str): ShaderFX material
+        Returns:
+            (tuple): Graph name and the states of all procedural switches
+        """
+        return (lib.sfxNodeIds.graph(mat),) + tuple(self.get(mat, nodeName) for nodeName in self.switchNodeNames())
+
+    def group(self, materials):
+        """
+        Groups materials by the permutation they compile into
+        Args:
+            materials (list): List of ShaderFX materials
+        Returns:
+            (dict): Dictionary of permutation (tuple) -> list of materials
+        """
+        groups = dict()
+        for mat in materials:
+            groups.setdefault(self.key(mat), []).append(mat)
+        return groups
+
+    def set(self, materials, nodeName, state):
+        """
+        Sets a switch in materials, only editing (and recompiling) the materials where it differs
+        The states are looked up again before comparing, as they might have been edited outside of NoiseFX
+        Args:
+            materials (list): List of ShaderFX materials
+            nodeName (str): Unique ShaderFX node name of the switch
+            state (bool): State to set the switch to
+        Returns:
+            (int): Number of recompiled materials
+        """
+        for mat in materials:
+            self.forget(mat, nodeName)
+        changed = [mat for mat in materials if self.get(mat, nodeName) not in (state, None)]
+        if not changed:
+            return 0
+        lib.printInfo("Recompiling {0} of {1} materials".format(len(changed), len(materials)))
+        for mat in changed:
+            cmds.shaderfx(sfxnode=mat, edit_bool=(getId(mat, nodeName), "value", state))
+            self.switches[mat][nodeName] = state
+        return len(changed)
+
+    def toggle(self, materials, nodeName):
+        """
+        Toggles a switch in materials, based on its state in the first material that has it
+        Args:
+            materials (list): List of ShaderFX materials
+            nodeName (str): Unique ShaderFX node name of the switch
+        Returns:
+            (bool): New state of the switch
+        """
+        for mat in materials:
+            self.forget(mat, nodeName)
+            state = self.get(mat, nodeName)
+            if state is not None:
+                break
+        else:
+            cmds.error("None of the selected materials have a {0} switch".format(nodeName))
+        self.set(materials, nodeName, not state)
+        return not state
+
+    def report(self, materials=None):
+        """
+        Reports the shader permutations of materials, refreshing their switch states
+        Args:
+            materials (list): List of ShaderFX materials (default: all ShaderFX materials in the scene)
+        Returns:
+            (dict): Dictionary of permutation (tuple) -> list of materials
+        """
+        if materials is None:
+            materials = cmds.ls(type="ShaderfxShader")
+        for mat in materials:
+            self.forget(mat)
+        groups = self.group(materials)
+        for permutation, mats in sorted(groups.items(), key=lambda item: -len(item[1])):
+            enabled = [nodeName for nodeName, state in zip(self.switchNodeNames(), permutation[1:]) if state]
+            print("{0} [{1}]: {2} materials".format(permutation[0], ", ".join(enabled), len(mats)))
+        lib.printInfo("{0} materials compile into {1} shader permutations".format(len(materials), len(groups)))
+        return groups
+
+    def forget(self, mat, nodeName=""):
+        """
+        Forgets the memoized switch states of a material
+        Args:
+            mat (str): ShaderFX material
+            nodeName (str): Unique ShaderFX node name of the switch to forget (default: all switches)
+        """
+        if nodeName:
+            self.switches.get(mat, dict()).pop(nodeName, None)
+        else:
+            self.switches.pop(mat, None)
+
+    def nodeRemoved(self, node, *args):
+        if self.switches:
+            self.switches.pop(om.MFnDependencyNode(node).name(), None)
+
+    def reset(self, *args):
+        """
+        Resets all memoized switch states
+        """
+        self.switches.clear()
+
+
+shaderPermutations = ShaderPermutations()  # shared shader permutations
+# ===========================================================================================
+
+
+#########################################################################################################
+# SLIDER SCHEDULING
+# Relative slider changes fire on every valueChanged signal, which can outpace the viewport with large selections
+class NoiseScheduler(object):
+    """
+    Coalesces relative noise slider changes, applying them at most once per viewport frame
+    Changes are accumulated per material and attribute and flushed in a deferred evaluation, once Maya is idle after
+    refreshing the viewport. Each flush reads all attributes at once and writes them through a single DG modifier,
+    which doesn't register in the undo queue, so the changes are committed as a single undoable operation once the
+    slider is released
+    """
+    def __init__(self):
+        self.deltas = dict()  # (material, attribute) -> list of relative changes in order of arrival
+        self.states = dict()  # material -> set of state node names to turn on
+        self.startValues = dict()  # attribute -> value before the first uncommitted change
+        self.statesOn = set()  # (material, state node name) turned on since the last commit
+        self.pending = False
+        self.commitPending = False
+
+    def add(self, materials, attr, valueDiff, stateNodeName="", commit=True):
+        """
+        Schedules a relative change of an attribute in materials
+        Args:
+            materials (list): List of materials to change
+            attr (str): Attribute to change
+            valueDiff (float): Relative change of the attribute
+            stateNodeName (str): Unique ShaderFX node name of the procedural state to turn on, if turned off
+            commit (bool): If the change should be committed after the flush, otherwise commit() has to be called
+                           (e.g., once a slider that is being dragged is released)
+        """
+        for mat in materials:
+            self.deltas.setdefault((mat, attr), []).append(valueDiff)
+            if stateNodeName:
+                self.states.setdefault(mat, set()).add(stateNodeName)
+        self.commitPending |= commit
+        if not self.pending:
+            self.pending = True
+            cmds.evalDeferred(self.flush, lowestPriority=True)
+
+    def flush(self):
+        """
+        Applies all scheduled changes
+        """
+        deltas, states, commit = self.deltas, self.states, self.commitPending
+        self.deltas, self.states, self.pending, self.commitPending = dict(), dict(), False, False
+
+        # turn on procedural noise if turned off
+        stateMaterials = dict()  # state node name -> list of materials
+        for mat in states:
+            for stateNodeName in states[mat]:
+                if (mat, stateNodeName) not in self.statesOn:
+                    stateMaterials.setdefault(stateNodeName, []).append(mat)
+        for stateNodeName, mats in stateMaterials.items():
+            shaderPermutations.set(mats, stateNodeName, True)  # once per material until the next commit
+            self.statesOn.update((mat, stateNodeName) for mat in mats)
+
+        # read all attributes at once, materials might have been deleted or renamed before the flush
+        attributes = dict(("{0}.{1}".format(mat, attr), valueDiffs) for (mat, attr), valueDiffs in deltas.items())
+        plugs = lib.getPlugs(attributes)
+
+        # compute new values in one pass
+        plugValues = []
+        for attribute, plug in plugs.items():
+            newValue = plug.asDouble()
+            self.startValues.setdefault(attribute, newValue)
+            single = lib.isSinglePrecision(plug)
+            for valueDiff in attributes[attribute]:
+                newValue += valueDiff  # accumulated in order, matching a write per change
+                if single:
+                    newValue = struct.unpack("f", struct.pack("f", newValue))[0]  # stored in single precision
+            plugValues.append((plug, newValue))
+        lib.setPlugValues(plugValues)
+
+        if commit:
+            self.commit()
+
+    def begin(self):
+        """
+        Starts a new slider drag, forgetting the changes of a previous drag that was never committed
+        """
+        self.startValues.clear()
+        self.statesOn.clear()
+
+    def commit(self):
+        """
+        Commits all applied changes as a single undoable operation
+        """
+        if self.pending:
+            self.commitPending = True
+            self.flush()  # flushes and commits
+            return
+        plugs = lib.getPlugs(self.startValues)
+        startValues = [(plug, self.startValues[attribute]) for attribute, plug in plugs.items()
+                       if plug.asDouble() != self.startValues[attribute]]
+        if startValues:
+            # the final values are already set, a single undoable command reverts them to the start values
+            finalValues = [(plug, plug.asDouble()) for plug, value in startValues]
+            lib.setPlugValues(finalValues, undoable=True, undoValues=startValues)
+        self.startValues.clear()
+        self.statesOn.clear()
+
+
+noiseScheduler = NoiseScheduler()  # shared slider scheduler
+# ===========================================================================================
+
+
 def getNodeNames(fx, idx):
     """
     Get node names of fx operation for procedural effects
@@ -170,13 +435,14 @@ def getMaterials():
         (list): list of materials
     """
     global lastMaterials
-    materials = lib.getMaterials(cmds.ls(sl=True))
+    materials = lib.materialResolver.get(cmds.ls(sl=True))  # memoized between slider ticks
+    materials = cmds.ls(materials, type="ShaderfxShader") if materials else []  # NoiseFX only exists in ShaderFX
     if not materials:
         if lastMaterials:
-            cmds.warning("No objects with materials have been selected, taking previous selection")
+            cmds.warning("No objects with ShaderFX materials have been selected, taking previous selection")
             materials = lastMaterials
         else:
-            cmds.error("No objects with materials have been selected")
+            cmds.error("No objects with ShaderFX materials have been selected")
     else:
         lastMaterials = materials
     return materials
@@ -205,10 +471,7 @@ def noiseWorldScale(widget):
     # get node names
     worldScale = "World_Scale_MNPR"
 
-    for mat in materials:
-        prevValue = cmds.getAttr("{0}.{1}".format(mat, worldScale))
-        newValue = prevValue + valueDiff
-        lib.setAttr(mat, worldScale, newValue)
+    noiseScheduler.add(materials, worldScale, valueDiff, commit=not widget.slider.isSliderDown())
 
 
 def noiseTypeClicked(fx):
@@ -222,12 +485,8 @@ def noiseTypeClicked(fx):
     # get node names of operation
     sfxNodes = getNodeNames(fx, 0)
 
-    lib.printInfo("Recompiling material")
-    typeId = getId(materials[0], sfxNodes.typeNodeName)  # base toggle on first material state
-    state = cmds.shaderfx(sfxnode=materials[0], getPropertyValue=(typeId, "value"))
-    for mat in materials:
-        cmds.shaderfx(sfxnode=mat, edit_bool=(typeId, "value", not state))
-    if state:
+    state = shaderPermutations.toggle(materials, sfxNodes.typeNodeName)
+    if not state:
         lib.printInfo("NoiseFX for {0} is now in 2D".format(fx.description))
     else:
         lib.printInfo("NoiseFX for {0} is now in 3D".format(fx.description))
@@ -244,13 +503,8 @@ def noiseToggleClicked(fx):
     # get node names of operation
     sfxNodes = getNodeNames(fx, 0)
 
-    lib.printInfo("Recompiling material")
-    stateId = getId(materials[0], sfxNodes.stateNodeName)  # base toggle on first material state
-    state = cmds.shaderfx(sfxnode=materials[0], getPropertyValue=(stateId, "value"))
-    for mat in materials:
-        stateId = getId(mat, sfxNodes.stateNodeName)
-        cmds.shaderfx(sfxnode=mat, edit_bool=(stateId, "value", not state))
-    if state:
+    state = shaderPermutations.toggle(materials, sfxNodes.stateNodeName)
+    if not state:
         lib.printInfo("NoiseFX for {0} is off".format(fx.description))
     else:
         lib.printInfo("NoiseFX for {0} is on".format(fx.description))
@@ -278,27 +532,15 @@ def noiseSlide(fx, widget):
     else:
         valueDiff /= 5.0
 
-    materials = getMaterials()
-
-    for mat in materials:
-        # turn on procedural noise if turned off
-        stateId = getId(mat, sfxNodes.stateNodeName)
-        if not cmds.shaderfx(sfxnode=mat, getPropertyValue=(stateId, "value")):
-            lib.printInfo("Recompiling material")
-            cmds.shaderfx(sfxnode=mat, edit_bool=(stateId, "value", True))
-
-        # get attribute name
-        attr = ""
-        if widget.label != "scale":
-            attr = sfxNodes.intensityNodeName
-        else:
-            attr = sfxNodes.scaleNodeName
+    # get attribute name
+    attr = ""
+    if widget.label != "scale":
+        attr = sfxNodes.intensityNodeName
+    else:
+        attr = sfxNodes.scaleNodeName
 
-        # set attribute
-        attribute = "{0}.{1}".format(mat, attr)
-        prevValue = cmds.getAttr(attribute)
-        newValue = prevValue+valueDiff
-        lib.setAttr(mat, attr, newValue)
+    # procedural noise is turned on if turned off
+    noiseScheduler.add(getMaterials(), attr, valueDiff, sfxNodes.stateNodeName, not widget.slider.isSliderDown())
 
 
 def noiseShift(fx, widget):
@@ -315,18 +557,9 @@ def noiseShift(fx, widget):
     # get node names
     sfxNodes = getNodeNames(fx, 0)
 
-    # shift each material
-    materials = getMaterials()
-    for mat in materials:
-        # turn on procedural noise if turned off
-        stateId = getId(mat, sfxNodes.stateNodeName)
-        if not cmds.shaderfx(sfxnode=mat, getPropertyValue=(stateId, "value")):
-            cmds.shaderfx(sfxnode=mat, edit_bool=(stateId, "value", True))
-
-        # set attribute
-        prevValue = cmds.getAttr("{0}.{1}".format(mat, sfxNodes.shiftNodeName))
-        newValue = prevValue+valueDiff
-        lib.setAttr(mat, sfxNodes.shiftNodeName, newValue)
+    # shift each material, procedural noise is turned on if turned off
+    noiseScheduler.add(getMaterials(), sfxNodes.shiftNodeName, valueDiff, sfxNodes.stateNodeName,
+                       not widget.isSliderDown())
 
 
 def noiseReset(fx):
@@ -335,19 +568,17 @@ def noiseReset(fx):
     Args:
         fx (MNPR_FX): MNPR_FX object coming from the caller
     """
+    noiseScheduler.commit()  # apply pending slider changes before resetting
+
     # get node names of operation
     sfxNodes = getNodeNames(fx, 0)
 
-    lib.printInfo("Recompiling material")
+    # turn off procedural noise
+    materials = getMaterials()
+    shaderPermutations.set(materials, sfxNodes.stateNodeName, False)
 
     # reset each material
-    materials = getMaterials()
     for mat in materials:
-
-        # turn off procedural noise
-        stateId = getId(mat, sfxNodes.stateNodeName)
-        cmds.shaderfx(sfxnode=mat, edit_bool=(stateId, "value", False))
-
         sfxNodes.refreshIds(mat)
         # reset attributes
         cmds.shaderfx(sfxnode=mat, edit_float=(sfxNodes.scale, "value", 1.0))
@@ -12,14 +12,28 @@
 
 """
 from __future__ import print_function
-import os, math, logging
+import os, re, math, json, base64, zlib, logging, multiprocessing
+from multiprocessing.pool import ThreadPool
 import maya.cmds as cmds
 import maya.mel as mel
 import maya.api.OpenMaya as om  # python api 2.0
+import maya.api.OpenMayaAnim as oma
 import coopLib as lib
+import coopUndo
+import mnpr_kernels as kernels
 import mnpr_system
 import mnpr_info
 
+try:
+    import numpy as np  # not shipped with every Maya version
+except ImportError:
+    np = None
+
+try:
+    basestring           # Python 2
+except NameError:
+    basestring = (str,)  # Python 3
+
 try:
     xrange          # Python 2
 except NameError:
@@ -30,6 +44,9 @@ logger = logging.getLogger("pFX")  # create a logger for this file
 logger.setLevel(logging.DEBUG)  # defines the logging level (INFO for releases)
 # logger.setLevel(logging.INFO)  # defines the logging level (DEBUG for debugging)
 
+CONTROL_SETS = ["controlSetA", "controlSetB", "controlSetC"]  # vertex color sets holding the control parameters
+KEY_CHANNELS = ["ColorR", "ColorG", "ColorB", "Alpha"]  # suffixes of the keyable vertexFace attributes (RGBA)
+
 
 def getId(mat, uniqueNodeName):
     """
@@ -40,9 +57,13 @@ def getId(mat, uniqueNodeName):
     Returns:
         (int): Node id in ShaderFX graph
     """
-    nodeId = cmds.shaderfx(sfxnode=mat, getNodeIDByName=uniqueNodeName)
+    return lib.sfxNodeIds.get(mat, uniqueNodeName)  # memoized per material
+
 
-    return nodeId
+VTX_CTRL_ATTRS = [("xUseControl", True),
+                  ("Color0_Source", "color:controlSetA"),
+                  ("Color1_Source", "color:controlSetB"),
+                  ("Color2_Source", "color:controlSetC")]  # vertex control attributes of dx11/GLSL materials
 
 
 def enableVtxCtrl(shapes):
@@ -52,25 +73,20 @@ def enableVtxCtrl(shapes):
         shapes (list): List of shapes (str) to enable vertex control to
     """
     # enable ctrl in material
-    selected = cmds.ls(sl=True, l=True)
-    cmds.hyperShade(smn=True)
-    mats = cmds.ls(sl=True, l=True, mat=True)
-    for mat in mats:
+    for mat in lib.materialResolver.get(shapes):
+        # only edit materials without vertex control, avoiding redundant edits (and recompiles)
         if cmds.nodeType(mat) == "ShaderfxShader":
             nodeId = getId(mat, "vtxControls")
-            cmds.shaderfx(sfxnode=mat, edit_bool=(nodeId, "value", True))
+            if not cmds.shaderfx(sfxnode=mat, getPropertyValue=(nodeId, "value")):
+                cmds.shaderfx(sfxnode=mat, edit_bool=(nodeId, "value", True))
         else:
-            if cmds.attributeQuery("xUseControl", node=mat, ex=True):
-                lib.setAttr(mat, "xUseControl", True)
-            if cmds.attributeQuery("Color0_Source", node=mat, ex=True):
-                lib.setAttr(mat, "Color0_Source", "color:controlSetA")
-            if cmds.attributeQuery("Color1_Source", node=mat, ex=True):
-                lib.setAttr(mat, "Color1_Source", "color:controlSetB")
-            if cmds.attributeQuery("Color2_Source", node=mat, ex=True):
-                lib.setAttr(mat, "Color2_Source", "color:controlSetC")
-    cmds.select(selected, r=True)
+            for attr, value in VTX_CTRL_ATTRS:
+                if cmds.attributeQuery(attr, node=mat, ex=True):
+                    if cmds.getAttr("{0}.{1}".format(mat, attr)) != value:
+                        lib.setAttr(mat, attr, value)
 
     # create vtx control sets
+    newShapes = []
     for shape in shapes:
         colorSets = cmds.polyColorSet(shape, query=True, allColorSets=True)
         if not colorSets:
@@ -78,50 +94,124 @@ def enableVtxCtrl(shapes):
         if "controlSetC" not in colorSets:
             logger.debug("Creating control sets for {0}".format(shape))
             # create color sets
-            cmds.polyColorSet(shape, cs='controlSetA', create=True)
-            cmds.polyColorSet(shape, cs='controlSetB', create=True)
-            cmds.polyColorSet(shape, cs='controlSetC', create=True)
-            defaultVertexColors(shape)
-
-
-def defaultVertexColors(shape):
-    """
-    Assign default vertex colors to shape
-    Args:
-        shape (str): Shape to assign default vertex colors to
-    """
-    oShape = lib.getMObject(shape)
-    fnMesh = om.MFnMesh(oShape)  # access mesh data (oShape can also be replaced by MDagPath of shape)
-    #controlSetA
-    oVertexColorArray = fnMesh.getVertexColors('controlSetA')  # MColorArray
-    vertexListLength = len(oVertexColorArray)
-    vertexIndexArray = list(xrange(vertexListLength))
-    for vertex in vertexIndexArray:
-        oVertexColorArray[vertex].r = 0.0
-        oVertexColorArray[vertex].g = 0.0
-        oVertexColorArray[vertex].b = 0.0
-        oVertexColorArray[vertex].a = 0.0
-    fnMesh.setCurrentColorSetName('controlSetA')
-    fnMesh.setVertexColors(oVertexColorArray, vertexIndexArray)
-    #controlSetB
-    oVertexColorArray = fnMesh.getVertexColors('controlSetB') #MColorArray
-    for vertex in vertexIndexArray:
-        oVertexColorArray[vertex].r = 0.0
-        oVertexColorArray[vertex].g = 0.0
-        oVertexColorArray[vertex].b = 0.0
-        oVertexColorArray[vertex].a = 0.0
-    fnMesh.setCurrentColorSetName('controlSetB')
-    fnMesh.setVertexColors(oVertexColorArray, vertexIndexArray)
-    #controlSetC
-    oVertexColorArray = fnMesh.getVertexColors('controlSetC') #MColorArray
-    for vertex in vertexIndexArray:
-        oVertexColorArray[vertex].r = 0.0
-        oVertexColorArray[vertex].g = 0.0
-        oVertexColorArray[vertex].b = 0.0
-        oVertexColorArray[vertex].a = 0.0
-    fnMesh.setCurrentColorSetName('controlSetC')
-    fnMesh.setVertexColors(oVertexColorArray, vertexIndexArray)
-    print("vertex colors should have been set")
+            for colorSet in CONTROL_SETS:
+                cmds.polyColorSet(shape, cs=colorSet, create=True)
+            newShapes.append(shape)
+    if newShapes:
+        defaultVertexColors(newShapes)  # prep all new shapes in one pass
+
+
+def defaultVertexColors(shapes):
+    """
+    Assign default vertex colors to the control sets of shapes
+    Args:
+        shapes (str, list): Shape or list of shapes to assign default vertex colors to
+    """
+    if isinstance(shapes, basestring):
+        shapes = [shapes]
+
+    defaultArrays = dict()  # zeroed control arrays, shared between shapes with the same vertex count
+    for shape in shapes:
+        oShape = lib.getMObject(shape)
+        fnMesh = om.MFnMesh(oShape)  # access mesh data (oShape can also be replaced by MDagPath of shape)
+        numVertices = fnMesh.numVertices
+        if numVertices not in defaultArrays:
+            oVertexColorArray = om.MColorArray(numVertices, om.MColor((0.0, 0.0, 0.0, 0.0)))  # preallocated MColorArray
+            defaultArrays[numVertices] = (oVertexColorArray, list(xrange(numVertices)))
+        oVertexColorArray, vertexIndexArray = defaultArrays[numVertices]
+        for colorSet in CONTROL_SETS:
+            fnMesh.setCurrentColorSetName(colorSet)
+            fnMesh.setVertexColors(oVertexColorArray, vertexIndexArray)
+        logger.debug("Default vertex colors set in {0}".format(shape))
+
+
+def benchmarkDefaultVertexColors(vertices=1000000):
+    """
+    Benchmarks defaultVertexColors on a temporary plane mesh and prints the time per million vertices
+    Args:
+        vertices (int): Approximate number of vertices of the benchmark mesh
+    Returns:
+        (float): Seconds per million vertices
+    """
+    import time
+    subdivisions = max(int(math.sqrt(vertices)) - 1, 1)
+    transform = cmds.polyPlane(sx=subdivisions, sy=subdivisions, ch=False)[0]
+    shape = lib.getShapes(transform)[0]
+    for colorSet in CONTROL_SETS:
+        cmds.polyColorSet(shape, cs=colorSet, create=True)
+    numVertices = cmds.polyEvaluate(shape, vertex=True)
+
+    timeStart = time.time()
+    defaultVertexColors(shape)
+    elapsed = time.time() - timeStart
+    cmds.delete(transform)
+
+    secPerMillion = elapsed * 1000000.0 / numVertices
+    lib.printInfo("defaultVertexColors: {0:.4f} sec per million vertices ({1} vertices)".format(secPerMillion, numVertices))
+    return secPerMillion
+
+
+def benchmarkVertexColorIO(vertexCounts=(100000, 1000000, 5000000)):
+    """
+    Benchmarks the reads and writes of color sets and their export/import on temporary plane meshes, comparing
+    lib.numpyToColorArray and lib.colorArrayToNumpy with conversions through lists of MColors
+    Args:
+        vertexCounts (tuple): Approximate number of vertices of each benchmark mesh
+    Returns:
+        (dict): Vertex count -> operation -> seconds
+    """
+    import time, tempfile
+    lib.checkNumpy()
+    results = dict()
+    tempDir = tempfile.mkdtemp()
+    for vertices in vertexCounts:
+        subdivisions = max(int(math.sqrt(vertices)) - 1, 1)
+        transform = cmds.polyPlane(sx=subdivisions, sy=subdivisions, ch=False)[0]
+        shape = lib.getShapes(transform)[0]
+        cmds.polyColorSet(shape, cs=CONTROL_SETS[0], create=True)
+        numVertices = cmds.polyEvaluate(shape, vertex=True)
+        colors = np.random.uniform(-1.0, 1.0, (numVertices, 4)).astype(np.float32)
+        fnMesh = om.MFnMesh(lib.getMObject(shape))
+        timings = results.setdefault(numVertices, dict())
+
+        timeStart = time.time()
+        oVertexColorArray = om.MColorArray()
+        for color in colors.tolist():
+            oVertexColorArray.append(om.MColor(color))
+        timings["element-wise to MColorArray"] = time.time() - timeStart
+        timeStart = time.time()
+        [vertexColor.getColor() for vertexColor in oVertexColorArray]
+        timings["element-wise from MColorArray"] = time.time() - timeStart
+        timeStart = time.time()
+        oVertexColorArray = lib.numpyToColorArray(colors)
+        timings["numpyToColorArray"] = time.time() - timeStart
+        timeStart = time.time()
+        lib.colorArrayToNumpy(oVertexColorArray)
+        timings["colorArrayToNumpy"] = time.time() - timeStart
+
+        timeStart = time.time()
+        lib.setVertexColorArray(shape, CONTROL_SETS[0], colors)
+        timings["write color set"] = time.time() - timeStart
+        timeStart = time.time()
+        lib.getVertexColorArray(shape, CONTROL_SETS[0], cached=False)
+        timings["read color set"] = time.time() - timeStart
+
+        for extension in [".json", lib.VTX_COLOR_EXT]:
+            path = os.path.join(tempDir, "benchmark{0}".format(extension))
+            lib.vtxColorCache.invalidate(shape)
+            timeStart = time.time()
+            lib.exportVertexColors([shape], path, namespace=False)
+            timings["export {0}".format(extension)] = time.time() - timeStart
+            timeStart = time.time()
+            lib.importVertexColors(path, namespace="")
+            timings["import {0}".format(extension)] = time.time() - timeStart
+            os.remove(path)
+        cmds.delete(transform)
+
+        for operation in sorted(timings):
+            print("{0} vertices, {1}: {2:.3f} sec".format(numVertices, operation, timings[operation]))
+    os.rmdir(tempDir)
+    return results
 
 
 @lib.timer
@@ -129,6 +219,7 @@ def update2MNPR():
     """
     Updates older versions
     """
+    lib.checkNumpy()
     if mnpr_system.refreshShaders():
         # delete old config node
         if cmds.objExists("watercolorConfig"):
@@ -152,8 +243,10 @@ def update2MNPR():
             logger.debug(shapes)
             if not shapes:
                 cmds.error("Some selected objects were not meshes!")
+            report = translateVtxCtrlShapes(shapes)
+            print("Control parameter upgrade report:")
             for shape in shapes:
-                translateVtxCtrl(shape)
+                print("  {0}: {1}".format(shape, report[shape]))
 
             # update vertex color sets mapping in shaders
             if os.name == 'nt' and mnpr_info.backend == 'dx11':
@@ -178,6 +271,62 @@ def update2MNPR():
         mnpr_system.dx112sfx()
 
 
+def legacyVtxCtrlVersion(shape):
+    """
+    Finds out the parametrization version of the control sets in shape, without modifying it
+    Args:
+        shape (str): Shape to check
+    Returns:
+        (str): "v1" for the first prototype, "v2" for later versions or "" if the shape has not been prepped
+    """
+    colorSets = cmds.polyColorSet(shape, query=True, allColorSets=True)
+    if not colorSets:
+        return ""
+    logger.debug(colorSets)
+    # check if default controlSetB exists (this will tell us if the color sets have been updated in the shape)
+    if "controlSetB" in colorSets:
+        return "v2"
+    if "controlSetA" in colorSets or "colorSet1" in colorSets:
+        return "v1"
+    return ""
+
+
+def readLegacyVtxCtrl(shape, version):
+    """
+    Reads the legacy control sets of shape as arrays
+    Args:
+        shape (str): Shape to read the control sets from
+        version (str): Parametrization version given by legacyVtxCtrlVersion()
+    Returns:
+        (list): (N, 4) float32 arrays of controlSetA, controlSetB and controlSetC
+    """
+    if version == "v1":
+        # the first prototype only had one color set, which is copied to all control sets
+        colorSets = cmds.polyColorSet(shape, query=True, allColorSets=True)
+        colorSet = "controlSetA" if "controlSetA" in colorSets else "colorSet1"
+        colors = lib.getVertexColorArray(shape, colorSet, cached=False)
+        return [colors, colors, colors]
+    return [lib.getVertexColorArray(shape, colorSet, cached=False) for colorSet in CONTROL_SETS]
+
+
+def writeTranslatedVtxCtrl(shape, version, controlSets):
+    """
+    Writes translated control sets into shape, creating the missing control sets of the first prototype
+    Args:
+        shape (str): Shape to write the control sets into
+        version (str): Parametrization version given by legacyVtxCtrlVersion()
+        controlSets (list): (N, 4) float arrays of controlSetA, controlSetB and controlSetC
+    """
+    if version == "v1":
+        if "controlSetA" not in cmds.polyColorSet(shape, query=True, allColorSets=True):
+            cmds.polyColorSet(shape, rename=True, colorSet="colorSet1", newColorSet='controlSetA')
+        # copy colorSetA to controlSetB and controlSetC
+        cmds.polyColorSet(shape, copy=True, colorSet='controlSetA', newColorSet='controlSetB')
+        cmds.polyColorSet(shape, copy=True, colorSet='controlSetA', newColorSet='controlSetC')
+    for colorSet, colors in zip(CONTROL_SETS, controlSets):
+        lib.setVertexColorArray(shape, colorSet, colors)
+
+
 def translateVtxCtrl(shape):
     """
     Translates vertex color parameters to conform with new parametrization schemes
@@ -185,77 +334,79 @@ def translateVtxCtrl(shape):
         shape (string): Shape to translate vertex color parameters
     """
     logger.info("Changing ctrl assignments in shape: {0}".format(shape))
-    v1 = False  # checking if its not the fist prototype
-
-    colorSets = cmds.polyColorSet(shape, query=True, allColorSets=True)
-    # update existing color sets
-    if colorSets:
-        logger.debug(colorSets)
-        # check if default controlSetB exists (this will tell us if the color sets have been updated in the shape)
-        if "controlSetB" not in colorSets:
-            v1 = True
-            if "colorSet1" in colorSets:
-                cmds.polyColorSet(shape, rename=True, colorSet="colorSet1", newColorSet='controlSetA')
-            if "controlSetA" not in cmds.polyColorSet(shape, query=True, allColorSets=True ):
-                # shape has color set but has not been prepped
-                logger.info("{0} has not been prepped, skipping.".format(shape))
-                return
-            # copy colorSetA to controlSetB and controlSetC
-            cmds.polyColorSet(shape, copy=True, colorSet='controlSetA', newColorSet='controlSetB')
-            cmds.polyColorSet(shape, copy=True, colorSet='controlSetA', newColorSet='controlSetC')
-        # modulate channels in maya python API
-        # initialize objects
-        oShape = lib.getMObject(shape)  # grabs the MObject of the shape
-        fnMesh = om.MFnMesh(oShape)  # access mesh data (oShape can also be replaced by MDagPath)
-        # controlSetA
-        oVertexColorArrayA = fnMesh.getVertexColors('controlSetA')  # MColorArray
-        vertexListLength = len(oVertexColorArrayA)
-        vertexIndexArray = list(xrange(vertexListLength))
-        if v1:
-            for vertex in vertexIndexArray:
-                oVertexColorArrayA[vertex].r = 0.5
-                oVertexColorArrayA[vertex].g = max(min(2.5 * oVertexColorArrayA[vertex].g, 1.0), 0.4)
-                oVertexColorArrayA[vertex].b = min((1.0 - oVertexColorArrayA[vertex].a) * 1.2, 1.0)
-                oVertexColorArrayA[vertex].a = 0
-        for vertex in vertexIndexArray:
-            oVertexColorArrayA[vertex].r = 0.0
-            oVertexColorArrayA[vertex].g = (oVertexColorArrayA[vertex].g - 0.5) * 2.0
-            oVertexColorArrayA[vertex].b = (oVertexColorArrayA[vertex].b - 0.6) * 1.67
-        fnMesh.setCurrentColorSetName('controlSetA')
-        fnMesh.setVertexColors(oVertexColorArrayA, vertexIndexArray)
-        # controlSetB
-        oVertexColorArrayB = fnMesh.getVertexColors('controlSetB')  # MColorArray
-        if v1:
-            for vertex in vertexIndexArray:
-                oVertexColorArrayB[vertex].r = min(2.0 * oVertexColorArrayB[vertex].r, 1.0)
-                oVertexColorArrayB[vertex].g = 0.5
-                oVertexColorArrayB[vertex].b = 0.5
-                oVertexColorArrayB[vertex].a = 0
-        for vertex in vertexIndexArray:
-            oVertexColorArrayB[vertex].r = (oVertexColorArrayB[vertex].r - 0.2) * 1.25
-            oVertexColorArrayB[vertex].g = 0
-            oVertexColorArrayB[vertex].b = 0
-        fnMesh.setCurrentColorSetName('controlSetB')
-        fnMesh.setVertexColors(oVertexColorArrayB, vertexIndexArray)
-        # controlSetC
-        oVertexColorArrayC = fnMesh.getVertexColors('controlSetC')  # MColorArray
-        if v1:
-            for vertex in vertexIndexArray:
-                oVertexColorArrayC[vertex].r = 0.2
-                oVertexColorArrayC[vertex].g = 0.5
-                oVertexColorArrayC[vertex].b = max(0.0, (oVertexColorArrayC[vertex].b - 0.5) * 2)
-                oVertexColorArrayC[vertex].a = 0.5
-        for vertex in vertexIndexArray:
-            oVertexColorArrayC[vertex].r = (oVertexColorArrayC[vertex].r - 0.2) * 1.25
-            oVertexColorArrayC[vertex].g = (oVertexColorArrayC[vertex].g - 0.5) * 2.0
-            blue = oVertexColorArrayC[vertex].b
-            oVertexColorArrayC[vertex].b = (oVertexColorArrayC[vertex].a - 0.5) * 2.0
-            oVertexColorArrayC[vertex].a = max((blue - 0.5) * 2.0, 0.0)
-        fnMesh.setCurrentColorSetName('controlSetC')
-        fnMesh.setVertexColors(oVertexColorArrayC, vertexIndexArray)
-        print("Control parameters changed in shape: {0}".format(shape))
-    else:
+    version = legacyVtxCtrlVersion(shape)
+    if not version:
         logger.info("{0} has not been prepped, skipping.".format(shape))
+        return
+    controlSets = readLegacyVtxCtrl(shape, version)
+    controlSets = kernels.translateControlSets(*controlSets, v1=(version == "v1"))
+    writeTranslatedVtxCtrl(shape, version, controlSets)
+    print("Control parameters changed in shape: {0}".format(shape))
+
+
+def translateVtxCtrlShapes(shapes, chunkSize=100):
+    """
+    Translates vertex color parameters of many shapes in three stages:
+        1. the control sets of all shapes are read into arrays
+        2. the arrays are translated in a worker pool (numpy releases the GIL)
+        3. the translated arrays are written back in chunks
+    The scene is only modified in the last stage, cancelling before leaves all shapes untouched
+    Args:
+        shapes (list): Shapes (str) to translate vertex color parameters
+        chunkSize (int): Number of shapes to write back between progress updates
+    Returns:
+        (dict): Report of each shape, either "translated", "not prepped" or "cancelled"
+    """
+    report = dict.fromkeys(shapes, "cancelled")
+    progress = lib.ProgressWindow("Upgrading control parameters", len(shapes) * 3, "Reading control sets")
+    try:
+        # read
+        jobs = []
+        for shape in shapes:
+            if not progress.update("Reading {0}".format(shape)):
+                return report
+            version = legacyVtxCtrlVersion(shape)
+            if not version:
+                report[shape] = "not prepped"
+                progress.update(step=2)
+                continue
+            jobs.append((shape, version, readLegacyVtxCtrl(shape, version)))
+
+        # transform
+        results = []
+        pool = ThreadPool(multiprocessing.cpu_count())
+        try:
+            for result in pool.imap(_translateJob, jobs):
+                results.append(result)
+                if not progress.update("Translating {0}".format(result[0])):
+                    return report
+        finally:
+            pool.terminate()
+
+        # write
+        for chunkStart in xrange(0, len(results), chunkSize):
+            chunk = results[chunkStart:chunkStart + chunkSize]
+            for shape, version, controlSets in chunk:
+                writeTranslatedVtxCtrl(shape, version, controlSets)
+                report[shape] = "translated"
+            if not progress.update("Writing control sets", step=len(chunk)):
+                return report
+    finally:
+        progress.end()
+
+    return report
+
+
+def _translateJob(job):
+    """
+    Worker job translating the control sets of a shape
+    Args:
+        job (tuple): (shape, version, controlSets) as read by translateVtxCtrlShapes()
+    Returns:
+        (tuple): (shape, version, translated controlSets)
+    """
+    shape, version, controlSets = job
+    return shape, version, kernels.translateControlSets(*controlSets, v1=(version == "v1"))
 
 
 def checkPaintingContext():
@@ -415,7 +566,6 @@ def paintKeyClicked(widget, key=True):
     mel.eval("ConvertSelectionToVertices;")
     selectedVertices = cmds.ls(sl=True, et="float3")
     if selectedVertices:
-        c = ["ColorR", "ColorG", "ColorB", "Alpha"]
         # get shape, channels and colorset
         shapes = lib.getShapes(selectedVertices)
         channels = widget.fx.channels
@@ -424,33 +574,64 @@ def paintKeyClicked(widget, key=True):
 
         # get suffix of attribute to key
         channelIdx = math.trunc(paintIndex(widget)/2.0)
+        if keyMode() == "tracks":
+            keyControlTracks(selectedVertices, colorSet, channels[channelIdx], key)
+            showKeyedTimeline(widget)
+            return
         suffix = ""
         for idx in xrange(len(channels[channelIdx])):
             if channels[channelIdx][idx]:
-                 suffix = c[idx]
+                 suffix = KEY_CHANNELS[idx]
                  break
-        # vertex colors in maya are stored per adjacent face, to minimize the amount
-        # of animation curves, we can find exactly which vtx face and attribute to key
-        # in the specified vertex color set, and its respective polyColorPerVertex node
-        vtxFaces = [vtx.replace("vtx", "vtxFace") for vtx in selectedVertices]
-        vtxFaceAttrs = cmds.listAttr(vtxFaces, s=True)  # list attributes of adjacent faces
-        attributes = [attr for attr in vtxFaceAttrs if "vertexFace{0}".format(suffix) in attr]
-        pColorVertexNodes = polyColorPerVertexNodes(shapes, colorSet)
-        if pColorVertexNodes:
-            for attr in attributes:
-                if key:
-                    # key vertex color attribute
-                    cmds.setKeyframe("{0}.{1}".format(pColorVertexNodes[0], attr))
-                else:
-                    # remove the vertex color key
-                    currentTime = cmds.currentTime(query=True)
-                    cmds.cutKey("{0}.{1}".format(pColorVertexNodes[0], attr), time=(currentTime, currentTime))
-        else:
-            cmds.error("History has been deleted from the mesh object, keying of vertex colors is impossible")
+        keyControlCurves(selectedVertices, colorSet, [suffix], key)
 
     showKeyedTimeline(widget)
 
 
+def keyControlCurves(vertices, colorSet, suffixes, key=True):
+    """
+    Inserts or removes a key at the current frame in the animation curves of the vertex colors of vertices
+    Args:
+        vertices (list): Vertex components (str) to key
+        colorSet (str): Color set to key
+        suffixes (list): Suffixes of the channel attributes to key, see KEY_CHANNELS
+        key (bool): Key or remove key
+    """
+    pColorVertexNode, attributes = controlCurveAttributes(vertices, colorSet, suffixes)
+    for attr in attributes:
+        if key:
+            # key vertex color attribute
+            cmds.setKeyframe("{0}.{1}".format(pColorVertexNode, attr))
+        else:
+            # remove the vertex color key
+            currentTime = cmds.currentTime(query=True)
+            cmds.cutKey("{0}.{1}".format(pColorVertexNode, attr), time=(currentTime, currentTime))
+
+
+def controlCurveAttributes(vertices, colorSet, suffixes):
+    """
+    Finds the keyable vertex color attributes of vertices
+    Args:
+        vertices (list): Vertex components (str)
+        colorSet (str): Color set of the attributes
+        suffixes (list): Suffixes of the channel attributes, see KEY_CHANNELS
+    Returns:
+        (tuple): polyColorPerVertex node (str) of the color set and its list of attributes (str)
+    """
+    # vertex colors in maya are stored per adjacent face, to minimize the amount
+    # of animation curves, we can find exactly which vtx face and attribute to key
+    # in the specified vertex color set, and its respective polyColorPerVertex node
+    shapes = lib.getShapes(vertices)
+    vtxFaces = [vtx.replace("vtx", "vtxFace") for vtx in vertices]
+    vtxFaceAttrs = cmds.listAttr(vtxFaces, s=True)  # list attributes of adjacent faces
+    names = ["vertexFace{0}".format(suffix) for suffix in suffixes]
+    attributes = [attr for attr in vtxFaceAttrs if [name for name in names if name in attr]]
+    pColorVertexNodes = polyColorPerVertexNodes(shapes, colorSet)
+    if not pColorVertexNodes:
+        cmds.error("History has been deleted from the mesh object, keying of vertex colors is impossible")
+    return pColorVertexNodes[0], attributes
+
+
 def showKeyedTimeline(widget):
     """
     Selects the polyColorPerVertex node associated to the geometry to show its timeline and keys
@@ -467,11 +648,73 @@ def showKeyedTimeline(widget):
         cmds.select(pColorPerVertexNode[0], d=True)
         selected.remove(pColorPerVertexNode[0])
 
+    # add control tracks to selection instead
+    if keyMode() == "tracks":
+        shapes = lib.getShapes(selected, l=True, quiet=True)
+        trackNodes = [track.node for track in sceneControlTracks()
+                      if track.shape in shapes and track.colorSet == widget.fx.controlSet]
+        cmds.select(trackNodes, add=True)
+        return
+
     # add current polyColorPerVertex node to selection
     pColorVertexNodes = polyColorPerVertexNodes(selected, widget.fx.controlSet)
     cmds.select(pColorVertexNodes, add=True)
 
 
+class PolyColorPerVertexIndex(object):
+    """
+    Index from shape and color set to the polyColorPerVertex nodes in the shape's history
+    Shapes are indexed once, the index is reset through DG callbacks whenever polyColorPerVertex nodes are
+    added, removed or renamed, or a scene is opened
+    """
+    def __init__(self):
+        self.shapeNodes = dict()  # shape (long name) -> list of (polyColorPerVertex node, colorSet) in history order
+        self.callbacks = []
+
+    def get(self, shape, colorSet=""):
+        """
+        Gets the polyColorPerVertex nodes of shape
+        Args:
+            shape (str): Long name of the shape
+            colorSet (str): Only get the nodes associated to the specified color set
+        Returns:
+            (list): polyColorPerVertex nodes
+        """
+        if shape not in self.shapeNodes:
+            self.index(shape)
+        return [node for node, nodeColorSet in self.shapeNodes[shape] if not colorSet or nodeColorSet == colorSet]
+
+    def index(self, shape):
+        """
+        Indexes the polyColorPerVertex nodes in the history of shape
+        Args:
+            shape (str): Long name of the shape
+        """
+        if not self.callbacks:
+            self.callbacks = [om.MDGMessage.addNodeAddedCallback(self.reset, "polyColorPerVertex"),
+                              om.MDGMessage.addNodeRemovedCallback(self.reset, "polyColorPerVertex"),
+                              om.MNodeMessage.addNameChangedCallback(om.MObject(), self.nameChanged),
+                              om.MSceneMessage.addCallback(om.MSceneMessage.kBeforeOpen, self.reset),
+                              om.MSceneMessage.addCallback(om.MSceneMessage.kBeforeNew, self.reset)]
+        history = cmds.listHistory(shape, leaf=True, interestLevel=1) or []
+        nodes = cmds.ls(history, type="polyColorPerVertex")
+        nodes = [node for node in history if node in nodes]  # keep history order
+        self.shapeNodes[shape] = [(node, cmds.getAttr("{0}.colorSetName".format(node))) for node in nodes]
+
+    def nameChanged(self, node, prevName, *args):
+        if self.shapeNodes and node.hasFn(om.MFn.kPolyColorPerVertex):
+            self.reset()
+
+    def reset(self, *args):
+        """
+        Resets the index
+        """
+        self.shapeNodes.clear()
+
+
+pColorVertexIndex = PolyColorPerVertexIndex()
+
+
 def polyColorPerVertexNodes(objs, colorSet=""):
     """
     Returns the polyColorPerVertex nodes associated to the passed objects
@@ -481,12 +724,10 @@ def polyColorPerVertexNodes(objs, colorSet=""):
     Returns:
         (list): polyColorPerVertex nodes
     """
-    history = cmds.listHistory(objs, leaf=True, interestLevel=1)
-    nodes = [node for node in history if cmds.nodeType(node) == "polyColorPerVertex"]
-    if colorSet:
-        return [node for node in nodes if cmds.getAttr("{0}.colorSetName".format(node)) == colorSet]
-    else:
-        return nodes
+    nodes = []
+    for shape in lib.getShapes(objs, l=True, quiet=True):
+        lib.ListUtils.update(nodes, pColorVertexIndex.get(shape, colorSet))
+    return nodes
 
 
 def paint(RGBA, paintType, cClamp=["none", 0, 1], aClamp=["none", 0, 1], colorSet="controlSetA"):
@@ -545,26 +786,561 @@ def vertexColorFloodMaya(colorSet, value, channels=[False, False, False, False],
         replace (bool): If the value needs to be replaced
     """
     logger.debug("-> Flooding {0} at channels {1} with value {2}".format(colorSet, channels, value))
-    channelChars = ['r', 'g', 'b', 'a']
     # find selected shapes
     selected = cmds.ls(sl=True)
     shapes = lib.getShapes(selected)
     enableVtxCtrl(shapes)
+    # find selected components, unless their whole shape is also selected
+    vertices = dict()
+    components = [sel for sel in selected if "." in sel]
+    if components:
+        vertices = lib.getComponentVertices(components)
+        objects = [sel for sel in selected if "." not in sel]
+        if objects:
+            for shape in lib.getShapes(objects, quiet=True):
+                vertices.pop(shape, None)
     # set the current color set
     try:
         cmds.polyColorSet(shapes, currentColorSet=True, cs=colorSet)  # sets the current color set of all shapes
     except RuntimeError:
         cmds.error("One or more of the objects has not been prepped")
-    # find channel to flood
-    for channel in channels:
-        if channel:
-            channelChar = channelChars[channels.index(channel)]
+    if replace:
+        logger.debug("Resetting control parameters in: {0} with {1}".format(shapes, value))
+    else:
+        logger.debug("Flooding control parameters in: {0} with {1}".format(shapes, value))
+    floodVertexColors(shapes, colorSet, value, channels, replace, vertices=vertices)
+
+
+def floodVertexColors(shapes, colorSet, value, channels=[False, False, False, False], replace=True, clamp=None,
+                      history=True, vertices=None):
+    """
+    Floods the vertex colors of a color set in shapes, working directly on the color arrays of each mesh
+    Each shape's color set is read and written exactly once per flood, regardless of the flooded channels
+    The flood is a single entry in the undo queue
+    Args:
+        shapes (list): Shapes (str) to flood
+        colorSet (str): Which color set to flood
+        value (float): What value to flood the color with
+        channels (bool lst): RGBA mask of color channels to flood
+        replace (bool): If the value replaces the colors or is added to them (relative)
+        clamp (list): [min, max] to clamp the flooded channels to (default: no clamping)
+        history (bool): If False, the polyColorPerVertex nodes of the color set are collapsed after flooding, to avoid
+                        growing the construction history with each flood (see collapseColorHistory())
+        vertices (dict): Shape (str) -> vertex indices to flood, given by lib.getComponentVertices()
+                         Only these entries are updated, shapes not in the dictionary are flooded entirely
+    """
+    lib.checkNumpy()
+    mask = [bool(channel) for channel in channels]
+    if not any(mask):
+        return
+    if vertices is None:
+        vertices = dict()
+    cmds.undoInfo(openChunk=True, cn="floodVertexColors")
+    try:
+        for shape in shapes:
+            shapeVertices = vertices.get(shape)
+            colors = lib.getVertexColorArray(shape, colorSet, shapeVertices)
             if replace:
-                logger.debug("Resetting control parameters in: {0} with {1}".format(shapes, value))
-                eval("cmds.polyColorPerVertex({0}={1})".format(channelChar, value))
+                colors[:, mask] = value
             else:
-                logger.debug("Flooding control parameters in: {0} with {1}".format(shapes, value))
-                eval("cmds.polyColorPerVertex({0}={1}, rel=True)".format(channelChar, value))
+                colors[:, mask] += value
+            if clamp is not None:
+                colors[:, mask] = colors[:, mask].clip(clamp[0], clamp[1])
+            lib.setVertexColorArray(shape, colorSet, colors, shapeVertices, undoable=True)
+
+        if not history:
+            collapseColorHistory(shapes, [colorSet])
+    finally:
+        cmds.undoInfo(closeChunk=True, cn="floodVertexColors")
+
+
+def collapseColorHistory(shapes, colorSets=CONTROL_SETS):
+    """
+    Collapses the polyColorPerVertex nodes of color sets in the history of shapes into a single node per color set
+    The rest of the construction history is left untouched and color sets with keyed vertex colors are skipped
+    Args:
+        shapes (list): Shapes (str) to collapse the color history of
+        colorSets (list): Color sets (str) to collapse
+    """
+    for shape in lib.getShapes(shapes, l=True, quiet=True):
+        for colorSet in colorSets:
+            nodes = pColorVertexIndex.get(shape, colorSet)
+            if len(nodes) < 2:
+                continue  # nothing to collapse
+            if [node for node in nodes if cmds.keyframe(node, q=True, keyframeCount=True)]:
+                continue  # keys would be lost
+            colors = lib.getVertexColorArray(shape, colorSet, cached=False)
+            cmds.delete(nodes)
+            lib.setVertexColorArray(shape, colorSet, colors, undoable=True)  # written into a new polyColorPerVertex
+
+
+#    _                  _
+#   | |_ _ __ __ _  ___| | _____
+#   | __| '__/ _` |/ __| |/ / __|
+#   | |_| | | (_| | (__|   <\__ \
+#    \__|_|  \__,_|\___|_|\_\___/
+#
+# Control tracks are an alternative storage mode for keyed control parameters. Instead of one animation curve
+# per vertexFace attribute, the keys of a shape's color set are stored as a compact (keys x vertices x RGBA)
+# array in a network node and interpolated by an expression of the scene whenever the time changes.
+KEY_MODES = ["curves", "tracks"]
+TRACK_EXPRESSION = "mnprControlTracks"  # expression playing back the control tracks of a scene
+
+
+def keyMode():
+    """
+    Returns the storage mode of keyed control parameters
+    Returns:
+        (str): "curves" for animation curves on polyColorPerVertex nodes (default) or "tracks" for control tracks
+    """
+    if cmds.optionVar(exists="MNPR_PaintFXKeyMode"):
+        return cmds.optionVar(q="MNPR_PaintFXKeyMode")
+    return KEY_MODES[0]
+
+
+def setKeyMode(mode):
+    """
+    Sets the storage mode of keyed control parameters
+    Args:
+        mode (str): "curves" or "tracks"
+    """
+    if mode not in KEY_MODES:
+        cmds.error("Key mode {0} is not one of {1}".format(mode, KEY_MODES))
+    cmds.optionVar(sv=("MNPR_PaintFXKeyMode", mode))
+
+
+class ControlTrack(object):
+    """
+    Keyed control parameters of a shape's color set, stored as compact per-frame arrays in a network node
+    """
+    def __init__(self, node):
+        """
+        Control track constructor, loads the track data of node
+        Args:
+            node (str): Network node holding the track
+        """
+        self.node = node
+        self.version = 0  # version of the track data the arrays were loaded from
+        self.oShape = None  # shape of the track (MObject), valid through renames
+        self.colorSet = ""
+        self.warned = False  # if playback warned about the construction history of the shape
+        self.frames = np.zeros(0, dtype=np.float64)  # sorted keyed frames
+        self.vertices = np.zeros(0, dtype=np.int32)  # sorted animated vertex indices
+        self.values = np.zeros((0, 0, 4), dtype=np.float32)  # keys x vertices x RGBA
+        self.channels = np.zeros(4, dtype=bool)  # animated RGBA channels
+        self.load()
+
+    @property
+    def shape(self):
+        return om.MDagPath.getAPathTo(self.oShape).fullPathName()
+
+    @staticmethod
+    def create(shape, colorSet):
+        """
+        Creates the network node of a new control track
+        Playback writes directly into the mesh, so its construction history needs to be baked and deformed shapes
+        can't have control tracks, as each write would add a polyColorPerVertex node to their history
+        Args:
+            shape (str): Shape with the animated control parameters
+            colorSet (str): Animated color set
+        Returns:
+            (ControlTrack): New control track
+        """
+        if cmds.ls(cmds.listHistory(shape, pruneDagObjects=True) or [], type="geometryFilter"):
+            cmds.error("{0} is deformed, control tracks can only play back on shapes without construction history. "
+                       "Use the curves key mode instead".format(shape))
+        if hasHistory(shape):
+            message = "Control tracks write their keys directly into {0}, which requires baking its construction " \
+                      "history.\nBake the construction history?".format(shape.split("|")[-1])
+            if cmds.about(batch=True) or cmds.confirmDialog(title="Bake construction history", message=message,
+                                                            button=["Bake", "Cancel"], defaultButton="Bake",
+                                                            cancelButton="Cancel", dismissString="Cancel") != "Bake":
+                cmds.error("Construction history of {0} was not baked, no control track was created".format(shape))
+            cmds.bakePartialHistory(shape, prePostDeformers=True)
+            if hasHistory(shape):
+                cmds.error("Construction history of {0} could not be baked, no control track was created".format(shape))
+        node = cmds.createNode("network", name="{0}_{1}_track".format(shape.split("|")[-1], colorSet))
+        cmds.addAttr(node, ln="shape", at="message")
+        cmds.addAttr(node, ln="colorSet", dt="string")
+        cmds.addAttr(node, ln="trackData", dt="string")
+        cmds.addAttr(node, ln="trackVersion", at="long")  # changed with every save, also reverted by undo
+        cmds.addAttr(node, ln="keys", at="double", k=True)  # keyed at each track key to show them in the timeline
+        cmds.connectAttr("{0}.message".format(shape), "{0}.shape".format(node))
+        cmds.setAttr("{0}.colorSet".format(node), colorSet, type="string")
+        if not cmds.objExists(TRACK_EXPRESSION):
+            # the scene plays back its tracks, also in batch renders and sessions that never loaded PaintFX
+            cmds.expression(name=TRACK_EXPRESSION, alwaysEvaluate=True, unitConversion="none",
+                            string='python("import mnpr_pFX; mnpr_pFX.applyControlTracks(" + frame + ")");')
+        return ControlTrack(node)
+
+    def load(self):
+        """
+        Loads the track data, shape and color set from the network node
+        """
+        self.version = cmds.getAttr("{0}.trackVersion".format(self.node))
+        shape = cmds.listConnections("{0}.shape".format(self.node), s=True, d=False, shapes=True)[0]
+        self.oShape = lib.getMObject(shape)
+        self.colorSet = cmds.getAttr("{0}.colorSet".format(self.node))
+        data = cmds.getAttr("{0}.trackData".format(self.node)) or ""
+        if not data:
+            return
+        data = json.loads(data)
+        self.frames = np.array(data["frames"], dtype=np.float64)
+        self.channels = np.array(data["channels"], dtype=bool)
+        self.vertices = decodeArray(data["vertices"], np.int32)
+        self.values = decodeArray(data["values"], np.float32).reshape(len(self.frames), len(self.vertices), 4)
+
+    def save(self):
+        """
+        Saves the track data into the network node and shows its keys in the timeline
+        """
+        data = {"frames": self.frames.tolist(),
+                "channels": self.channels.tolist(),
+                "vertices": encodeArray(self.vertices),
+                "values": encodeArray(self.values)}
+        self.version = cmds.getAttr("{0}.trackVersion".format(self.node)) + 1
+        cmds.undoInfo(openChunk=True, cn="saveControlTrack")
+        try:
+            cmds.setAttr("{0}.trackData".format(self.node), json.dumps(data), type="string")
+            cmds.setAttr("{0}.trackVersion".format(self.node), self.version)
+            cmds.cutKey(self.node, at="keys", clear=True)
+            for frame in self.frames:
+                cmds.setKeyframe(self.node, at="keys", t=frame, v=0)
+        finally:
+            cmds.undoInfo(closeChunk=True, cn="saveControlTrack")
+
+    def delete(self):
+        """
+        Deletes the network node of the track, and the playback expression with the last track of the scene
+        """
+        cmds.delete(self.node)
+        controlTrackIndex.tracks.pop(self.node, None)
+        if not sceneControlTracks() and cmds.objExists(TRACK_EXPRESSION):
+            cmds.delete(TRACK_EXPRESSION)
+
+    def keyIndex(self, frame):
+        """
+        Returns the index of the key at frame, -1 if frame is not keyed
+        """
+        indices = np.flatnonzero(np.isclose(self.frames, frame))
+        return indices[0] if len(indices) else -1
+
+    def setKey(self, frame, vertices, colors, channels):
+        """
+        Sets a key with the colors of vertices
+        Args:
+            frame (float): Frame to key
+            vertices (ndarray): Sorted (K,) array of unique vertex indices to key
+            colors (ndarray): (K, 4) RGBA colors of the vertices
+            channels (list): RGBA mask of the keyed channels
+        """
+        vertices = np.asarray(vertices, dtype=np.int32)
+        colors = np.asarray(colors, dtype=np.float32)
+        # new vertices hold the keyed colors on all existing keys
+        newVertices = np.setdiff1d(vertices, self.vertices)
+        if len(newVertices):
+            allVertices = np.union1d(self.vertices, newVertices).astype(np.int32)
+            values = np.empty((len(self.frames), len(allVertices), 4), dtype=np.float32)
+            values[:, np.searchsorted(allVertices, self.vertices)] = self.values
+            values[:, np.searchsorted(allVertices, newVertices)] = colors[np.searchsorted(vertices, newVertices)]
+            self.vertices = allVertices
+            self.values = values
+        # new keys start from the interpolated state of all animated vertices
+        index = self.keyIndex(frame)
+        if index < 0:
+            row = self.evaluate(frame)
+            if row is None:
+                row = np.zeros((len(self.vertices), 4), dtype=np.float32)
+            index = np.searchsorted(self.frames, frame)
+            self.frames = np.insert(self.frames, index, frame)
+            self.values = np.insert(self.values, index, row, axis=0)
+        self.values[index, np.searchsorted(self.vertices, vertices)] = colors
+        self.channels |= np.array([bool(channel) for channel in channels])
+
+    def removeKey(self, frame):
+        """
+        Removes the key at frame
+        Args:
+            frame (float): Keyed frame
+        Returns:
+            (bool): If the track still has keys
+        """
+        index = self.keyIndex(frame)
+        if index >= 0:
+            self.frames = np.delete(self.frames, index)
+            self.values = np.delete(self.values, index, axis=0)
+        return len(self.frames) > 0
+
+    def evaluate(self, frame):
+        """
+        Linearly interpolates the keyed colors at frame, holding the first and last keys
+        Args:
+            frame (float): Frame to evaluate
+        Returns:
+            (ndarray): (V, 4) RGBA colors of the animated vertices, None if the track has no keys
+        """
+        if not len(self.frames):
+            return None
+        if frame <= self.frames[0]:
+            return self.values[0]
+        if frame >= self.frames[-1]:
+            return self.values[-1]
+        index = np.searchsorted(self.frames, frame)  # frames[index - 1] < frame <= frames[index]
+        weight = (frame - self.frames[index - 1]) / (self.frames[index] - self.frames[index - 1])
+        return self.values[index - 1] + (self.values[index] - self.values[index - 1]) * np.float32(weight)
+
+    def apply(self, frame):
+        """
+        Writes the animated channels of the track at frame into the shape
+        Args:
+            frame (float): Frame to apply
+        """
+        values = self.evaluate(frame)
+        if values is None or not len(self.vertices) or not om.MObjectHandle(self.oShape).isValid():
+            return
+        if om.MFnDependencyNode(self.oShape).findPlug("inMesh", False).isDestination:
+            if not self.warned:
+                logger.warning("{0} has construction history, control track {1} is not played back. Bake its history "
+                               "to play it back".format(self.shape, self.node))
+                self.warned = True
+            return  # each write would add a polyColorPerVertex node
+        colors = lib.getVertexColorArray(self.shape, self.colorSet, self.vertices)
+        colors[:, self.channels] = values[:, self.channels]
+        lib.setVertexColorArray(self.shape, self.colorSet, colors, self.vertices)
+
+
+def encodeArray(array):
+    """
+    Encodes an array into a compressed base64 string
+    Args:
+        array (ndarray): Array to encode
+    Returns:
+        (str): Encoded array
+    """
+    return base64.b64encode(zlib.compress(np.ascontiguousarray(array).tobytes())).decode("ascii")
+
+
+def decodeArray(text, dtype):
+    """
+    Decodes an array encoded by encodeArray()
+    Args:
+        text (str): Encoded array
+        dtype (type): Numpy data type of the array
+    Returns:
+        (ndarray): Flat decoded array
+    """
+    return np.frombuffer(zlib.decompress(base64.b64decode(text)), dtype=dtype).copy()
+
+
+def hasHistory(shape):
+    """
+    Checks if a shape has construction history
+    Args:
+        shape (str): Shape to check
+    Returns:
+        (bool): If the shape has input connections to its mesh
+    """
+    return bool(cmds.listConnections("{0}.inMesh".format(shape), s=True, d=False))
+
+
+def getControlTrack(shape, colorSet, create=False):
+    """
+    Gets the control track of a shape's color set
+    Args:
+        shape (str): Shape of the track
+        colorSet (str): Color set of the track
+        create (bool): If the track should be created when it doesn't exist
+    Returns:
+        (ControlTrack): Control track of the shape's color set, None if it doesn't exist
+    """
+    longShape = cmds.ls(shape, l=True)[0]
+    for track in sceneControlTracks():
+        if track.shape == longShape and track.colorSet == colorSet:
+            return track
+    if create:
+        track = ControlTrack.create(longShape, colorSet)
+        controlTrackIndex.tracks[track.node] = track
+        return track
+    return None
+
+
+def keyControlTracks(components, colorSet, channels, key=True):
+    """
+    Inserts or removes a key at the current frame in the control tracks of the components' shapes
+    Args:
+        components (list): Components (str) to key
+        colorSet (str): Color set to key
+        channels (list): RGBA mask of the keyed channels
+        key (bool): Key or remove key
+    """
+    lib.checkNumpy()
+    frame = cmds.currentTime(query=True)
+    for shape, vertices in lib.getComponentVertices(components).items():
+        track = getControlTrack(shape, colorSet, create=key)
+        if track is None:
+            continue
+        if key:
+            track.setKey(frame, vertices, lib.getVertexColorArray(shape, colorSet, vertices), channels)
+        elif not track.removeKey(frame):
+            track.delete()  # remove track without keys
+            continue
+        track.save()
+
+
+class ControlTrackIndex(object):
+    """
+    Index of the control tracks of the scene, played back at every evaluation of the playback expression
+    Track nodes are only listed again when network or mesh nodes are added or removed, nodes are renamed or a scene is
+    opened. Tracks are only parsed again when the version of their track data changed (e.g., by an undo)
+    """
+    def __init__(self):
+        self.nodes = None  # track nodes of the scene, None if they need to be listed
+        self.tracks = dict()  # track node (str) -> ControlTrack
+        self.callbacks = []
+
+    def get(self):
+        """
+        Gets the control tracks of the scene
+        Returns:
+            (list): Control tracks of the scene
+        """
+        if self.nodes is None:
+            self.index()
+        tracks = []
+        for node in self.nodes:
+            track = self.tracks.get(node)
+            if track is None or track.version != cmds.getAttr("{0}.trackVersion".format(node)):
+                track = self.tracks[node] = ControlTrack(node)
+            tracks.append(track)
+        return tracks
+
+    def index(self):
+        """
+        Lists the track nodes of the scene, forgetting tracks that no longer exist
+        """
+        if not self.callbacks:
+            self.callbacks = [om.MDGMessage.addNodeAddedCallback(self.reset, "network"),
+                              om.MDGMessage.addNodeRemovedCallback(self.reset, "network"),
+                              om.MDGMessage.addNodeAddedCallback(self.reset, "mesh"),
+                              om.MDGMessage.addNodeRemovedCallback(self.reset, "mesh"),
+                              om.MNodeMessage.addNameChangedCallback(om.MObject(), self.reset),
+                              om.MSceneMessage.addCallback(om.MSceneMessage.kBeforeOpen, self.clear),
+                              om.MSceneMessage.addCallback(om.MSceneMessage.kBeforeNew, self.clear)]
+        self.nodes = []
+        for node in cmds.ls("*.trackVersion", o=True, r=True, type="network") or []:
+            if not cmds.listConnections("{0}.shape".format(node), s=True, d=False, shapes=True):
+                logger.warning("Control track {0} is not connected to a shape, skipping.".format(node))
+                continue
+            self.nodes.append(node)
+        for node in [node for node in self.tracks if node not in self.nodes]:
+            del self.tracks[node]
+
+    def reset(self, *args):
+        """
+        Resets the track nodes, which are listed again on the next playback
+        """
+        self.nodes = None
+
+    def clear(self, *args):
+        """
+        Resets the track nodes and forgets all tracks
+        """
+        self.nodes = None
+        self.tracks.clear()
+
+
+controlTrackIndex = ControlTrackIndex()
+
+
+def sceneControlTracks():
+    """
+    Gets the control tracks of the scene
+    Returns:
+        (list): Control tracks of the scene
+    """
+    if np is None:
+        return []
+    return controlTrackIndex.get()
+
+
+def applyControlTracks(frame=None):
+    """
+    Writes the control tracks of the scene at frame into their shapes, called by the playback expression of the scene
+    Args:
+        frame (float): Frame to apply (default: current frame)
+    """
+    if frame is None:
+        frame = cmds.currentTime(query=True)
+    for track in sceneControlTracks():
+        track.apply(frame)
+
+
+#        _        _
+#    ___| |_ __ _| |_ ___
+#   / __| __/ _` | __/ __|
+#   \__ \ || (_| | |_\__ \
+#   |___/\__\__,_|\__|___/
+#
+SCENE_STATS = "<scene>"  # key of the scene-wide statistics
+
+
+def controlStatistics(shapes=None, colorSets=CONTROL_SETS, percentiles=(5, 50, 95), bins=20, valueRange=(-1.0, 1.0)):
+    """
+    Computes per-channel statistics and histograms of the control parameters in shapes with vectorized reductions
+    Args:
+        shapes (list): Shapes (str) to compute statistics of (default: all prepped meshes in the scene)
+        colorSets (list): Control sets to compute statistics of
+        percentiles (tuple): Percentiles to compute [0 - 100]
+        bins (int): Number of histogram bins
+        valueRange (tuple): (min, max) range of the histogram, values outside are counted in the outer bins
+    Returns:
+        (dict): shape (or SCENE_STATS for all shapes) -> colorSet -> statistics dictionary with the (4,) RGBA arrays
+                "min", "max", "mean", the (len(percentiles), 4) array "percentiles", the (4, bins) array "histogram"
+                and the number of "vertices"
+    """
+    lib.checkNumpy()
+    if shapes is None:
+        shapes = cmds.ls(type="mesh", noIntermediate=True, l=True)
+    stats = dict()
+    sceneColors = dict((colorSet, []) for colorSet in colorSets)
+    for shape in shapes:
+        shapeColorSets = cmds.polyColorSet(shape, query=True, allColorSets=True) or []
+        for colorSet in colorSets:
+            if colorSet not in shapeColorSets:
+                continue
+            colors = lib.getVertexColorArray(shape, colorSet, cached=False)  # one-shot read, not cached
+            stats.setdefault(shape, dict())[colorSet] = arrayStatistics(colors, percentiles, bins, valueRange)
+            sceneColors[colorSet].append(colors)
+    for colorSet in colorSets:
+        if sceneColors[colorSet]:
+            colors = np.concatenate(sceneColors[colorSet])
+            stats.setdefault(SCENE_STATS, dict())[colorSet] = arrayStatistics(colors, percentiles, bins, valueRange)
+    return stats
+
+
+def arrayStatistics(colors, percentiles=(5, 50, 95), bins=20, valueRange=(-1.0, 1.0)):
+    """
+    Computes per-channel statistics and a histogram of an RGBA array
+    Args:
+        colors (ndarray): (N, 4) RGBA array
+        percentiles (tuple): Percentiles to compute [0 - 100]
+        bins (int): Number of histogram bins
+        valueRange (tuple): (min, max) range of the histogram, values outside are counted in the outer bins
+    Returns:
+        (dict): Statistics dictionary, see controlStatistics()
+    """
+    if not len(colors):
+        return {"vertices": 0}
+    # histogram of all channels with a single bincount
+    binIndices = ((colors - valueRange[0]) * (bins / float(valueRange[1] - valueRange[0]))).astype(np.int64)
+    binIndices = binIndices.clip(0, bins - 1) + np.arange(4) * bins
+    histogram = np.bincount(binIndices.ravel(), minlength=4 * bins).reshape(4, bins)
+    return {"vertices": len(colors),
+            "min": colors.min(axis=0),
+            "max": colors.max(axis=0),
+            "mean": colors.mean(axis=0, dtype=np.float64),
+            "percentiles": np.percentile(colors, percentiles, axis=0),
+            "histogram": histogram}
 
 
 #    _                            _      __                         _
@@ -573,15 +1349,24 @@ def vertexColorFloodMaya(colorSet, value, channels=[False, False, False, False],
 #   | | | | | | | |_) | (_) | |  | |_ / /  __/>  <| |_) | (_) | |  | |_
 #   |_|_| |_| |_| .__/ \___/|_|   \__/_/ \___/_/\_\ .__/ \___/|_|   \__|
 #               |_|                               |_|
-def exportPaintFX():
+PAINTFX_FILE_FILTERS = ["Vertex parameters (*{0})".format(lib.VTX_COLOR_EXT), "JSON vertex parameters (*.json)"]
+
+
+def exportPaintFX(dtype="float32", encoding=None, compression="zlib", incremental=True):
     """
-    Export the painted vertex colors of the selected objects to a json file
+    Export the painted vertex colors of the selected objects to a binary container or a json file
+    Args:
+        dtype (str): Float type of binary containers, "float32" or "float16" (half the size)
+        encoding (str): "rle" and "sparse" only store painted (non-zero) vertices, "dense" stores all vertices
+                        (default: "rle" for binary containers, "dense" for json files readable by earlier versions)
+        compression (str): "zlib" or "none" (memory-mapped on import) compression of binary containers
+        incremental (bool): If re-exporting to an existing binary container only encodes the changed color sets
     """
     # get selected objects
     selected = cmds.ls(sl=True)
 
     # get save directory
-    fileFilter = "*.json"
+    fileFilter = ";;".join(PAINTFX_FILE_FILTERS)
     exportPath = cmds.fileDialog2(fileFilter=fileFilter, fileMode=0,
                                   startingDirectory=cmds.workspace(rd=True, q=True),
                                   cap="Export vertex parameters as:", dialogStyle=2)
@@ -589,15 +1374,18 @@ def exportPaintFX():
         cmds.error("Filename not specified")
     exportPath = exportPath[0]
 
-    lib.exportVertexColors(selected, exportPath)
+    lib.exportVertexColors(selected, exportPath, dtype, encoding, compression=compression, incremental=incremental)
 
 
-def importPaintFX():
+def importPaintFX(match="name", colorSets=None):
     """
-    Import vertex colors of a previously exported json file
+    Import vertex colors of a previously exported binary container or json file
+    Args:
+        match (str): "name" matches shapes by name, "topology" by their topology in binary containers (no prompts)
+        colorSets (list): Only restore these color sets, e.g. ["controlSetC"] (default: all color sets)
     """
     # get import directory
-    fileFilter = "*.json"
+    fileFilter = ";;".join(["All vertex parameters (*{0} *.json)".format(lib.VTX_COLOR_EXT)] + PAINTFX_FILE_FILTERS)
     importPath = cmds.fileDialog2(fileFilter=fileFilter, fileMode=1,
                                   startingDirectory=cmds.workspace(rd=True, q=True),
                                   cap="Import vertex parameters from:", dialogStyle=2)
@@ -605,4 +1393,140 @@ def importPaintFX():
         cmds.error("Filename not specified")
     importPath = importPath[0]
 
-    lib.importVertexColors(importPath)
+    lib.importVertexColors(importPath, match, colorSets=colorSets)
+
+
+def exportPaintFXSequence(frameRange=None, dtype="float32", compression="zlib"):
+    """
+    Export the animated vertex colors of the selected objects over a frame range to a binary container
+    Args:
+        frameRange (tuple): (start, end) frames to sample (default: playback range)
+        dtype (str): Float type of the container, "float32" or "float16" (half the size)
+        compression (str): "zlib" or "none" compression of the container
+    """
+    # get selected objects
+    selected = cmds.ls(sl=True)
+    if frameRange is None:
+        frameRange = (cmds.playbackOptions(q=True, min=True), cmds.playbackOptions(q=True, max=True))
+
+    # get save directory
+    exportPath = cmds.fileDialog2(fileFilter=PAINTFX_FILE_FILTERS[0], fileMode=0,
+                                  startingDirectory=cmds.workspace(rd=True, q=True),
+                                  cap="Export vertex parameter sequence as:", dialogStyle=2)
+    if not exportPath:
+        cmds.error("Filename not specified")
+    exportPath = exportPath[0]
+
+    frames = list(range(int(math.floor(frameRange[0])), int(math.ceil(frameRange[1])) + 1))
+    lib.exportVertexColorSequence(selected, exportPath, frames, dtype, compression=compression)
+
+
+def importPaintFXSequence(match="name", colorSets=None):
+    """
+    Import an animated vertex color sequence, rebuilding its keys as control tracks
+    Args:
+        match (str): "name" matches shapes by name, "topology" by their topology (no prompts)
+        colorSets (list): Only restore these color sets (default: all color sets)
+    """
+    # get import directory
+    importPath = cmds.fileDialog2(fileFilter=PAINTFX_FILE_FILTERS[0], fileMode=1,
+                                  startingDirectory=cmds.workspace(rd=True, q=True),
+                                  cap="Import vertex parameter sequence from:", dialogStyle=2)
+    if not importPath:
+        cmds.error("Filename not specified")
+    importPath = importPath[0]
+
+    lib.importVertexColors(importPath, match, apply=applyControlSequence, colorSets=colorSets)
+
+
+def applyControlSequence(shape, colorSet, sequence):
+    """
+    Applies an animated control parameter sequence, keying all its frames at once in the control track of the color set
+    The shape keeps the colors of the first frame, only the vertices and channels that change are keyed
+    Args:
+        shape (str): Shape to apply the sequence to
+        colorSet (str): Color set of the sequence
+        sequence (dict): Sampled "frames" and their (frames x vertices x RGBA) "colors"
+    """
+    if not isinstance(sequence, dict) or "frames" not in sequence:
+        lib.applyVertexColors(shape, colorSet, sequence)  # static colors
+        return
+    values = np.array(sequence["colors"], dtype=np.float32)
+    vertexCount = cmds.polyEvaluate(shape, vertex=True)
+    if values.shape[1] != vertexCount:
+        lib.printWarning("{0} has {1} vertices but its sequence has {2}, skipping {3}".format(shape, vertexCount,
+                                                                                            values.shape[1], colorSet))
+        return
+    lib.setVertexColorArray(shape, colorSet, values[0])
+
+    changes = values != values[0]  # frames x vertices x RGBA
+    vertices = np.flatnonzero(changes.any(axis=(0, 2))).astype(np.int32)
+    channels = changes.any(axis=(0, 1))
+    if keyMode() == "curves":
+        if len(vertices):
+            keyControlSequence(shape, colorSet, sequence["frames"], values, vertices, channels)
+        return
+    track = getControlTrack(shape, colorSet, create=len(vertices) > 0)
+    if track is None:
+        return
+    if not len(vertices):
+        track.delete()  # the imported sequence is static, previous keys no longer apply
+        return
+    track.frames = np.array(sequence["frames"], dtype=np.float64)
+    track.vertices = vertices
+    track.values = np.ascontiguousarray(values[:, vertices])
+    track.channels = channels
+    track.save()
+    track.apply(cmds.currentTime(query=True))
+
+
+def keyControlSequence(shape, colorSet, frames, values, vertices, channels):
+    """
+    Keys an animated control parameter sequence in the animation curves of the vertex colors, like painted keys
+    Each curve is created once and gets all keys of the sequence at once, as a single undoable operation
+    Args:
+        shape (str): Shape to key the sequence in
+        colorSet (str): Color set of the sequence
+        frames (list): Sampled frames
+        values (ndarray): (frames x vertices x RGBA) colors of the sequence
+        vertices (ndarray): Indices of the vertices that change
+        channels (ndarray): RGBA mask of the channels that change
+    """
+    components = ["{0}.vtx[{1}]".format(shape, vertex) for vertex in vertices]
+    suffixes = [suffix for suffix, channel in zip(KEY_CHANNELS, channels) if channel]
+    pColorVertexNode, attributes = controlCurveAttributes(components, colorSet, suffixes)
+    curveKeys = []  # (MPlug, MDoubleArray of values)
+    for attribute, plug in lib.getPlugs(["{0}.{1}".format(pColorVertexNode, attr) for attr in attributes]).items():
+        vertex = re.search(r"vertexColor\[(\d+)\]", attribute)
+        channel = [index for index, suffix in enumerate(KEY_CHANNELS) if attribute.endswith("Face{0}".format(suffix))]
+        if vertex is None or not channel:
+            continue  # compound attribute, its children are keyed
+        curveKeys.append((plug, om.MDoubleArray(values[:, int(vertex.group(1)), channel[0]].tolist())))
+    times = om.MTimeArray([om.MTime(frame, om.MTime.uiUnit()) for frame in frames])
+
+    modifier = om.MDGModifier()  # creates and connects the new curves
+    change = oma.MAnimCurveChange()  # keys of the curves
+    keyed = []
+
+    def undo():
+        change.undoIt()
+        modifier.undoIt()
+
+    def redo():
+        if keyed:
+            modifier.doIt()
+            change.redoIt()
+            return
+        fnCurve = oma.MFnAnimCurve()
+        for plug, curveValues in curveKeys:
+            curves = [source.node() for source in plug.connectedTo(True, False)
+                      if source.node().hasFn(om.MFn.kAnimCurve)]
+            if curves:
+                fnCurve.setObject(curves[0])
+            else:
+                fnCurve.create(plug, oma.MFnAnimCurve.kAnimCurveTU, modifier)
+                modifier.doIt()  # only runs the operations queued since its last call
+            fnCurve.addKeys(times, curveValues, oma.MFnAnimCurve.kTangentGlobal, oma.MFnAnimCurve.kTangentGlobal,
+                            False, change)
+        keyed.append(True)
+    coopUndo.commit(undo, redo)
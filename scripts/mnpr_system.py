@@ -194,7 +194,7 @@ def updateShaderFX():
 
         # load new graph
         shaderFile = os.path.join(shaderDir, "{0}.sfx".format(matAttrs["graph"]))
-        cmds.shaderfx(sfxnode=mat, loadGraph=shaderFile)
+        lib.loadGraph(mat, shaderFile)
 
         # set attributes
         mnpr_matPresets.setMaterialAttrs(mat, matAttrs)
@@ -291,7 +291,7 @@ def dx112sfx(graph="mnpr_uber"):
         cmds.select(shapes, r=True)
         cmds.hyperShade(assign=shader)
         shaderFile = os.path.join(mnpr_info.environment, "shaders", "{0}.sfx".format(graph))
-        cmds.shaderfx(sfxnode=shader, loadGraph=shaderFile)
+        lib.loadGraph(shader, shaderFile)
         print(">>> Shader {0} created".format(shader))
         # assign settings
         vtxControl = bool(cmds.getAttr("{0}.{1}".format(dx11Shader, "xUseControl")))
@@ -0,0 +1,12 @@
+import os, sys
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+SCRIPTS_DIR = os.path.join(os.path.dirname(TESTS_DIR), "scripts")
+STUBS_DIR = os.path.join(TESTS_DIR, "stubs")
+if SCRIPTS_DIR not in sys.path:
+    sys.path.insert(0, SCRIPTS_DIR)
+
+try:
+    import maya.cmds  # mayapy
+except ImportError:
+    sys.path.insert(0, STUBS_DIR)  # stand-in maya package
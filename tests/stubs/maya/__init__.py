@@ -0,0 +1,3 @@
+"""
+Stand-in maya package to import the MNPR modules outside of Maya, tests patch the commands they run
+"""
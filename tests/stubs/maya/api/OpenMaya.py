@@ -0,0 +1,11 @@
+"""
+Stand-in python api 2.0, only what the MNPR modules define at import time
+"""
+
+
+class MPxCommand(object):
+    pass
+
+
+class MObject(object):
+    pass
@@ -0,0 +1,2 @@
+def eval(command):
+    raise NotImplementedError("maya.mel.eval is not available outside of Maya: {0}".format(command))
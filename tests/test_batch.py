@@ -0,0 +1,112 @@
+"""
+Tests of the batch manifest and jobs against the stand-in maya package
+"""
+import os
+import json
+import pytest
+
+import maya.cmds as cmds
+import coopLib as lib
+import mnpr_batch as batch
+
+
+def writeManifest(tmpdir, manifest):
+    path = os.path.join(str(tmpdir), "manifest.json")
+    with open(path, 'w') as f:
+        json.dump(manifest, f)
+    return path
+
+
+@pytest.fixture
+def scene(monkeypatch):
+    """ Records the cmds.file calls of a job """
+    calls = []
+    monkeypatch.setattr(cmds, "file", lambda *args, **kwargs: calls.append((args, kwargs)), raising=False)
+    monkeypatch.setattr(cmds, "ls", lambda *args, **kwargs: ["|shotShape"], raising=False)
+    return calls
+
+
+def test_manifest_defaults_and_paths(tmpdir):
+    path = writeManifest(tmpdir, {"jobs": [
+        {"scene": "shots/sh010.mb", "action": "export", "path": "params/sh010.vcb"},
+        {"scene": "shots/sh020.mb", "action": "import", "path": "params/sh010.vcb", "output": "out/sh020.mb"}]})
+    exportJob, importJob = batch.readManifest(path)["jobs"]
+    root = str(tmpdir)
+    assert exportJob["scene"] == os.path.join(root, "shots", "sh010.mb")
+    assert exportJob["encoding"] is None
+    assert exportJob["compression"] == "zlib"
+    assert importJob["path"] == os.path.join(root, "params", "sh010.vcb")
+    assert importJob["output"] == os.path.join(root, "out", "sh020.mb")
+    assert importJob["save"] is False
+
+
+@pytest.mark.parametrize("jobs, message", [
+    ([{"scene": "a.mb", "action": "render", "path": "a.vcb"}], "no valid action"),
+    ([{"scene": "a.mb", "action": "export"}], "has no path"),
+    ([{"scene": "a.mb", "action": "export", "path": "a.vcb", "save": True}], "unknown options: save"),
+])
+def test_manifest_errors(tmpdir, jobs, message):
+    with pytest.raises(ValueError, match=message):
+        batch.readManifest(writeManifest(tmpdir, {"jobs": jobs}))
+
+
+def test_manifest_without_jobs(tmpdir):
+    with pytest.raises(ValueError, match="no list of jobs"):
+        batch.readManifest(writeManifest(tmpdir, {"workers": 2}))
+
+
+def test_export_job(tmpdir, scene, monkeypatch):
+    exported = []
+    monkeypatch.setattr(lib, "exportVertexColors", lambda objs, path, *args: exported.append((objs, path, args)) or
+                        ["shotShape"])
+    path = writeManifest(tmpdir, {"jobs": [{"scene": "sh010.mb", "action": "export", "path": "sh010.vcb"}]})
+    job = batch.readManifest(path)["jobs"][0]
+    result = batch.runJob(job)
+    assert result["status"] == "ok", result["error"]
+    assert result["shapes"] == ["shotShape"]
+    assert exported == [(["|shotShape"], job["path"], ("float32", None, False, "zlib", True))]
+    assert scene == [((job["scene"],), {"open": True, "force": True})]
+
+
+def test_import_job_does_not_overwrite_scene(tmpdir, scene, monkeypatch):
+    monkeypatch.setattr(lib, "importVertexColors", lambda *args, **kwargs: ["shotShape"])
+    path = writeManifest(tmpdir, {"jobs": [{"scene": "sh020.mb", "action": "import", "path": "sh010.vcb"}]})
+    result = batch.runJob(batch.readManifest(path)["jobs"][0])
+    assert result["status"] == "ok", result["error"]
+    assert len(scene) == 1  # only opened
+
+
+def test_import_job_saves_to_output(tmpdir, scene, monkeypatch):
+    monkeypatch.setattr(lib, "importVertexColors", lambda *args, **kwargs: ["shotShape"])
+    path = writeManifest(tmpdir, {"jobs": [{"scene": "sh020.mb", "action": "import", "path": "sh010.vcb",
+                                            "output": "sh020_params.ma"}]})
+    job = batch.readManifest(path)["jobs"][0]
+    batch.runJob(job)
+    assert scene[1:] == [((), {"rename": job["output"]}), ((), {"save": True, "force": True, "type": "mayaAscii"})]
+
+
+def test_failed_job(tmpdir, scene, monkeypatch):
+    def importVertexColors(*args, **kwargs):
+        raise RuntimeError("no matching shapes")
+    monkeypatch.setattr(lib, "importVertexColors", importVertexColors)
+    path = writeManifest(tmpdir, {"jobs": [{"scene": "sh020.mb", "action": "import", "path": "sh010.vcb",
+                                            "save": True}]})
+    result = batch.runJob(batch.readManifest(path)["jobs"][0])
+    assert result["status"] == "failed"
+    assert "no matching shapes" in result["error"]
+    assert len(scene) == 1  # not saved
+
+
+def test_batch_runs_exports_first(tmpdir, scene, monkeypatch):
+    order = []
+    monkeypatch.setattr(lib, "exportVertexColors", lambda *args: order.append("export") or [])
+    monkeypatch.setattr(lib, "importVertexColors", lambda *args, **kwargs: order.append("import") or [])
+    path = writeManifest(tmpdir, {"jobs": [{"scene": "sh020.mb", "action": "import", "path": "sh010.vcb"},
+                                           {"scene": "sh010.mb", "action": "export", "path": "sh010.vcb"}]})
+    reportPath = os.path.join(str(tmpdir), "report.json")
+    report = batch.runBatch(batch.readManifest(path), workers=0, reportPath=reportPath)
+    assert order == ["export", "import"]
+    assert [result["action"] for result in report["results"]] == ["import", "export"]
+    assert report["succeeded"] == 2 and report["failed"] == 0
+    with open(reportPath) as f:
+        assert json.load(f)["succeeded"] == 2
@@ -0,0 +1,18 @@
+"""
+The toolset has to load on Maya versions without numpy, the numpy code paths are guarded by checkNumpy()
+"""
+import os
+import sys
+import subprocess
+import pytest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+@pytest.mark.parametrize("module", ["coopLib", "mnpr_nFX", "mnpr_kernels", "mnpr_batch"])
+def test_import_without_numpy(module):
+    code = "import sys; sys.modules['numpy'] = None; sys.path[:0] = sys.argv[1:]; import {0}".format(module)
+    paths = [os.path.join(TESTS_DIR, "stubs"), os.path.join(os.path.dirname(TESTS_DIR), "scripts")]
+    process = subprocess.Popen([sys.executable, "-c", code] + paths, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    out, err = process.communicate()
+    assert process.returncode == 0, err.decode()
@@ -0,0 +1,85 @@
+"""
+Golden tests of the migration kernels against the per-vertex math of the legacy translateVtxCtrl
+"""
+import pytest
+
+np = pytest.importorskip("numpy")
+import mnpr_kernels as kernels
+
+CONTROL_SET_A = [[0.3, 0.75, 0.9, 0.2], [0.1, 0.1, 0.5, 0.9]]
+CONTROL_SET_B = [[0.6, 0.3, 0.2, 0.1], [0.1, 0.9, 0.9, 0.0]]
+CONTROL_SET_C = [[0.4, 0.25, 0.8, 0.7], [0.2, 0.5, 0.3, 0.1]]
+
+GOLDEN = {
+    False: ([[0.0, 0.5, 0.501, 0.2], [0.0, -0.8, -0.167, 0.9]],
+            [[0.5, 0.0, 0.0, 0.1], [-0.125, 0.0, 0.0, 0.0]],
+            [[0.25, -0.5, 0.4, 0.6], [0.0, 0.0, -0.8, 0.0]]),
+    True: ([[0.0, 1.0, 0.6012, 0.0], [0.0, -0.2, -0.8016, 0.0]],
+           [[1.0, 0.0, 0.0, 0.0], [0.0, 0.0, 0.0, 0.0]],
+           [[0.0, 0.0, 0.0, 0.2], [0.0, 0.0, 0.0, 0.0]]),
+}
+
+
+def legacyTranslate(a, b, c, v1):
+    """ Per-vertex port of the legacy translateVtxCtrl loops on lists of [r, g, b, a] """
+    a, b, c = [[list(color) for color in colors] for colors in (a, b, c)]
+    for color in a:
+        if v1:
+            color[0] = 0.5
+            color[1] = max(min(2.5 * color[1], 1.0), 0.4)
+            color[2] = min((1.0 - color[3]) * 1.2, 1.0)
+            color[3] = 0
+        color[0] = 0.0
+        color[1] = (color[1] - 0.5) * 2.0
+        color[2] = (color[2] - 0.6) * 1.67
+    for color in b:
+        if v1:
+            color[0] = min(2.0 * color[0], 1.0)
+            color[1] = 0.5
+            color[2] = 0.5
+            color[3] = 0
+        color[0] = (color[0] - 0.2) * 1.25
+        color[1] = 0
+        color[2] = 0
+    for color in c:
+        if v1:
+            color[0] = 0.2
+            color[1] = 0.5
+            color[2] = max(0.0, (color[2] - 0.5) * 2)
+            color[3] = 0.5
+        color[0] = (color[0] - 0.2) * 1.25
+        color[1] = (color[1] - 0.5) * 2.0
+        blue = color[2]
+        color[2] = (color[3] - 0.5) * 2.0
+        color[3] = max((blue - 0.5) * 2.0, 0.0)
+    return a, b, c
+
+
+@pytest.mark.parametrize("v1", [False, True])
+def test_golden_arrays(v1):
+    translated = kernels.translateControlSets(CONTROL_SET_A, CONTROL_SET_B, CONTROL_SET_C, v1)
+    for result, golden in zip(translated, GOLDEN[v1]):
+        assert result.dtype == np.float32
+        assert result.shape == (2, 4)
+        np.testing.assert_allclose(result, golden, atol=1e-6)
+
+
+@pytest.mark.parametrize("v1", [False, True])
+def test_matches_legacy_loops(v1):
+    rng = np.random.RandomState(7)
+    colors = [rng.rand(64, 4).astype(np.float32) for _ in range(3)]
+    legacy = legacyTranslate(*(colors + [v1]))
+    translated = kernels.translateControlSets(*(colors + [v1]))
+    for result, expected in zip(translated, legacy):
+        np.testing.assert_allclose(result, expected, atol=1e-6)
+
+
+def test_inputs_are_not_modified():
+    colors = np.array(CONTROL_SET_C, dtype=np.float32)
+    kernels.translateControlSetC(colors, v1=True)
+    np.testing.assert_array_equal(colors, np.array(CONTROL_SET_C, dtype=np.float32))
+
+
+def test_flat_input_is_reshaped():
+    result = kernels.translateControlSetB(np.ravel(CONTROL_SET_B))
+    np.testing.assert_allclose(result, GOLDEN[False][1], atol=1e-6)
@@ -0,0 +1,43 @@
+"""
+Tests of the NoiseFX switch toggles against a stand-in of the shaderfx command
+"""
+import pytest
+
+import maya.cmds as cmds
+import coopLib as lib
+import mnpr_nFX as nFX
+
+
+@pytest.fixture
+def switches(monkeypatch):
+    """ Switch states of materials, (material, node name) -> state, materials without a switch have no entry """
+    states = {}
+
+    def shaderfx(sfxnode, getNodeIDByName=None, getPropertyValue=None, edit_bool=None):
+        if getNodeIDByName is not None:
+            return getNodeIDByName
+        if getPropertyValue is not None:
+            if (sfxnode, getPropertyValue[0]) not in states:
+                raise RuntimeError("{0} has no {1}".format(sfxnode, getPropertyValue[0]))
+            return states[(sfxnode, getPropertyValue[0])]
+        states[(sfxnode, edit_bool[0])] = edit_bool[2]
+    monkeypatch.setattr(cmds, "shaderfx", shaderfx, raising=False)
+    monkeypatch.setattr(lib, "printInfo", lambda message: None)
+    permutations = nFX.ShaderPermutations()
+    permutations.callbacks = [None]  # no DG callbacks outside of Maya
+    monkeypatch.setattr(lib.sfxNodeIds, "callbacks", [None])
+    monkeypatch.setattr(lib.sfxNodeIds, "ids", {})
+    return permutations, states
+
+
+def test_toggle_skips_materials_without_switch(switches):
+    permutations, states = switches
+    states.update({("matB", "noiseState"): True, ("matC", "noiseState"): False})
+    assert permutations.toggle(["matA", "matB", "matC"], "noiseState") is False
+    assert states == {("matB", "noiseState"): False, ("matC", "noiseState"): False}
+
+
+def test_toggle_without_switch(switches):
+    permutations, states = switches
+    with pytest.raises(RuntimeError, match="noiseState"):
+        permutations.toggle(["matA"], "noiseState")
@@ -0,0 +1,69 @@
+"""
+Tests of the undoable python api writes against stand-ins of MDGModifier and the coopUndo command
+"""
+import pytest
+
+import coopLib as lib
+
+
+class Plug(object):
+    def __init__(self, value):
+        self.value = value
+
+    def asDouble(self):
+        return self.value
+
+
+class Modifier(object):
+    """ Runs each queued operation only once, as MDGModifier.doIt() without undoIt() in between """
+    def __init__(self):
+        self.queued = []
+
+    def newPlugValueDouble(self, plug, value):
+        self.queued.append((plug, value))
+
+    def doIt(self):
+        for plug, value in self.queued:
+            plug.value = value
+        self.queued = []
+
+
+@pytest.fixture
+def undoQueue(monkeypatch):
+    """ Records committed operations as the undo queue of the coopUndo command """
+    queue = []
+
+    def commit(undo, redo):
+        redo()
+        queue.append((undo, redo))
+    monkeypatch.setattr(lib.om, "MDGModifier", Modifier, raising=False)
+    monkeypatch.setattr(lib.coopUndo, "commit", commit)
+    return queue
+
+
+def test_set_plug_values_undo_redo(undoQueue):
+    plugs = [Plug(0.0), Plug(1.0)]
+    lib.setPlugValues([(plugs[0], 0.5), (plugs[1], 2.0)], undoable=True)
+    (undo, redo), = undoQueue
+    for _ in range(3):
+        assert [plug.value for plug in plugs] == [0.5, 2.0]
+        undo()
+        assert [plug.value for plug in plugs] == [0.0, 1.0]
+        redo()
+
+
+def test_set_plug_values_undo_values(undoQueue):
+    plug = Plug(0.75)  # already set during a drag
+    lib.setPlugValues([(plug, 0.75)], undoable=True, undoValues=[(plug, 0.25)])
+    (undo, redo), = undoQueue
+    undo()
+    assert plug.value == 0.25
+    redo()
+    assert plug.value == 0.75
+
+
+def test_set_plug_values_not_undoable(undoQueue):
+    plug = Plug(0.0)
+    lib.setPlugValues([(plug, 1.0)])
+    assert plug.value == 1.0
+    assert not undoQueue